@@ -3,20 +3,40 @@ Router module for client-related endpoints.
 Handles all HTTP requests for client operations including create, read, update, and delete.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Optional, Dict
 from app.auth.router import get_current_user, get_admin_user
 from app.models import User, UserRole
-from app.clients.service.logic import interpret_and_calculate, MODEL
-from app.clients.schema import PredictionInput
-
-from app.database import get_db
-from app.clients.service.client_service import ClientService
+from app.clients.service.logic import (
+    interpret_and_calculate,
+    interpret_and_calculate_batch,
+    what_if,
+    PREDICTION_CACHE
+)
+from app.clients.schema import PredictionInput, WhatIfRequest
+
+from app.database import get_async_db
+from app.clients.service.client_service import (
+    AsyncClientService,
+    case_worker_query,
+    criteria_query,
+    services_query,
+    success_rate_query
+)
+from app.clients.service.prediction_service import AsyncPredictionService
+from app.clients.service.executor import PREDICTION_EXECUTOR
+from app.clients.service.batcher import MicroBatcher
+from app.config import settings
+from app.clients.service.tree_engine import model_type_name
+from app.clients.service.registry import MODEL_REGISTRY, SHADOW_SCORER
 from app.clients.schema import (
     ClientResponse,
     ClientUpdate,
     ClientListResponse,
+    ClientPredictionResponse,
     ServiceResponse,
     ServiceUpdate
 )
@@ -24,33 +44,179 @@ from app.clients.schema import (
 router = APIRouter(prefix="/clients", tags=["clients"])
 
 
+async def _predict_batch_in_pool(inputs):
+    """Score a micro-batch of raw inputs in the prediction worker pool"""
+    return await PREDICTION_EXECUTOR.run(interpret_and_calculate_batch, inputs)
+
+
+PREDICTION_BATCHER = MicroBatcher(
+    _predict_batch_in_pool,
+    window_seconds=settings.prediction_microbatch_window_ms / 1000,
+    max_batch_size=settings.prediction_microbatch_max_size
+)
+
+
+def _validate_model_name(model_name):
+    """Raise a 400 error unless model_name is a registered model"""
+    model_names = MODEL_REGISTRY.names()
+    if model_name not in model_names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Model '{model_name}' not found. Available models: {model_names}"
+        )
+
+
+def _interpret_with_model(input_data, model_name, explain=False):
+    """Score one client with a registered model, or the active model if None"""
+    model = MODEL_REGISTRY.get(model_name) if model_name else None
+    return interpret_and_calculate(input_data, model=model, explain=explain)
+
+
+def _what_if_with_model(input_data, feature_values, include_interventions, model_name):
+    """Run a what-if grid with a registered model, or the active model if None"""
+    model = MODEL_REGISTRY.get(model_name) if model_name else None
+    return what_if(input_data, feature_values, include_interventions, model=model)
+
+
+def _interpret_batch_with_model(input_batch, model_name, explain=False):
+    """Score many clients with a registered model, or the active model if None"""
+    model = MODEL_REGISTRY.get(model_name) if model_name else None
+    return interpret_and_calculate_batch(input_batch, model=model, explain=explain)
+
+
+def _current_model_info():
+    """Return the active model's name and type, loading it on first use"""
+    from app.clients.service import logic
+    return {
+        "name": MODEL_REGISTRY.current_name(),
+        "type": model_type_name(logic.get_model())
+    }
+
+
+async def _run_prediction(func, *args):
+    """Run a prediction in the worker pool, turning unsupported options into a 400"""
+    try:
+        return await PREDICTION_EXECUTOR.run(func, *args)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        ) from e
+
+
+MODEL_QUERY = Query(None, description="Registered model to use instead of the active model")
+EXPLAIN_QUERY = Query(
+    False,
+    description="Add each intervention's Shapley value and standalone uplift to the response"
+)
+
+
 @router.post("/predictions")
-async def predict(data: PredictionInput):
-    return interpret_and_calculate(data.model_dump())
+async def predict(
+        data: PredictionInput,
+        background_tasks: BackgroundTasks,
+        model: Optional[str] = MODEL_QUERY,
+        explain: bool = EXPLAIN_QUERY
+):
+    input_data = data.model_dump()
+    if model is not None:
+        _validate_model_name(model)
+    if model is None and not explain and settings.prediction_microbatch_enabled:
+        result = await PREDICTION_BATCHER.submit(input_data)
+    else:
+        result = await _run_prediction(_interpret_with_model, input_data, model, explain)
+    background_tasks.add_task(SHADOW_SCORER.submit, [input_data], [result])
+    return result
+
+
+@router.post("/predictions/batch")
+async def predict_batch(
+        data: List[PredictionInput],
+        background_tasks: BackgroundTasks,
+        model: Optional[str] = MODEL_QUERY,
+        explain: bool = EXPLAIN_QUERY
+):
+    """Score a list of clients in a single vectorized model call per chunk"""
+    if model is not None:
+        _validate_model_name(model)
+    input_batch = [item.model_dump() for item in data]
+    results = await _run_prediction(_interpret_batch_with_model, input_batch, model, explain)
+    background_tasks.add_task(SHADOW_SCORER.submit, input_batch, results)
+    return results
+
+
+@router.post("/predictions/what-if")
+async def predict_what_if(data: WhatIfRequest, model: Optional[str] = MODEL_QUERY):
+    """Predict how a client's outcome changes over a grid of one or two feature values"""
+    if model is not None:
+        _validate_model_name(model)
+    feature_values = {feature.name: feature.values for feature in data.features}
+    if len(feature_values) != len(data.features):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each feature can only be varied once"
+        )
+    return await _run_prediction(
+        _what_if_with_model,
+        data.client.model_dump(),
+        feature_values,
+        data.include_interventions,
+        model
+    )
+
+
+@router.get("/predictions/cache", response_model=Dict[str, float])
+async def get_prediction_cache_stats():
+    """Get prediction cache size and hit/miss/eviction counters"""
+    return PREDICTION_CACHE.stats()
+
+
+@router.get("/predictions/workers", response_model=Dict[str, float])
+async def get_prediction_worker_stats():
+    """Get prediction worker pool queue depth, wait time and rejection counters"""
+    return PREDICTION_EXECUTOR.stats()
+
+
+@router.get("/predictions/batcher")
+async def get_prediction_batcher_stats():
+    """Get micro-batch size and latency histograms"""
+    return PREDICTION_BATCHER.stats()
 
 
 @router.get("/", response_model=ClientListResponse)
 async def get_clients(
         skip: int = Query(default=0, ge=0, description="Number of records to skip"),
         limit: int = Query(default=50, ge=1, le=150, description="Maximum number of records to return"),
+        after_id: Optional[str] = Query(
+            default=None, description="next_cursor of the previous page; replaces skip"
+        ),
         _: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    return ClientService.get_clients(db, skip, limit)
+    return await AsyncClientService.get_clients(db, skip, limit, after_id)
 
 
 @router.get("/{client_id}", response_model=ClientResponse)
 async def get_client(
         client_id: int,
         _: User = Depends(get_admin_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific client by ID"""
-    return ClientService.get_client(db, client_id)
+    return await AsyncClientService.get_client(db, client_id)
 
 
-@router.get("/search/by-criteria", response_model=List[ClientResponse])
-async def get_clients_by_criteria(
+@router.get("/{client_id}/predictions", response_model=ClientPredictionResponse)
+async def get_client_predictions(
+        client_id: int,
+        _: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Get the stored prediction for a client under the active model"""
+    return await AsyncPredictionService.get_client_predictions(db, client_id)
+
+
+def search_criteria(
     employment_status: Optional[bool] = None,
     education_level: Optional[int] = Query(None, ge=1, le=14),
     age_min: Optional[int] = Query(None, ge=18),
@@ -74,42 +240,106 @@ async def get_clients_by_criteria(
     attending_school: Optional[bool] = None,
     substance_use: Optional[bool] = None,
     time_unemployed: Optional[int] = Query(None, ge=0),
-    need_mental_health_support_bool: Optional[bool] = None,
+    need_mental_health_support_bool: Optional[bool] = None
+):
+    """Collect the client search criteria query parameters shared by the search routes"""
+    return {
+        "employment_status": employment_status,
+        "education_level": education_level,
+        "age_min": age_min,
+        "gender": gender,
+        "work_experience": work_experience,
+        "canada_workex": canada_workex,
+        "dep_num": dep_num,
+        "canada_born": canada_born,
+        "citizen_status": citizen_status,
+        "fluent_english": fluent_english,
+        "reading_english_scale": reading_english_scale,
+        "speaking_english_scale": speaking_english_scale,
+        "writing_english_scale": writing_english_scale,
+        "numeracy_scale": numeracy_scale,
+        "computer_scale": computer_scale,
+        "transportation_bool": transportation_bool,
+        "caregiver_bool": caregiver_bool,
+        "housing": housing,
+        "income_source": income_source,
+        "felony_bool": felony_bool,
+        "attending_school": attending_school,
+        "substance_use": substance_use,
+        "time_unemployed": time_unemployed,
+        "need_mental_health_support_bool": need_mental_health_support_bool
+    }
+
+
+def search_page(
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000, description="Maximum number of clients to return; all when unset"
+    ),
+    after_id: Optional[str] = Query(
+        None, description="Cursor from the X-Next-Cursor header of the previous page"
+    ),
+    stream: bool = Query(False, description="Stream the clients as NDJSON, one per line")
+):
+    """Collect the pagination and streaming query parameters shared by the search routes"""
+    return {"limit": limit, "after_id": after_id, "stream": stream}
+
+
+async def _ndjson_clients(db, query, limit, after_id):
+    """Serialize the clients of a search chunk by chunk, one JSON object per line"""
+    async for clients in AsyncClientService.stream_clients(
+        db, query, limit, after_id, chunk_size=settings.search_stream_chunk_size
+    ):
+        yield "".join(
+            ClientResponse.model_validate(client).model_dump_json() + "\n"
+            for client in clients
+        )
+
+
+async def _search_results(db, query, response, page):
+    """
+    Answer a client search as a JSON page or, with stream, as NDJSON.
+
+    The JSON page puts the next page's cursor in the X-Next-Cursor header so
+    the body stays a plain list of clients.
+    """
+    if page["stream"]:
+        return StreamingResponse(
+            _ndjson_clients(db, query, page["limit"], page["after_id"]),
+            media_type="application/x-ndjson"
+        )
+    clients, next_cursor = await AsyncClientService.get_clients_page(
+        db, query, page["limit"], page["after_id"]
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return clients
+
+
+@router.get("/search/by-criteria", response_model=List[ClientResponse])
+async def get_clients_by_criteria(
+    response: Response,
+    criteria: Dict[str, Any] = Depends(search_criteria),
+    page: Dict[str, Any] = Depends(search_page),
     _: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Search clients by any combination of criteria"""
-    return ClientService.get_clients_by_criteria(
-        db,
-        employment_status=employment_status,
-        education_level=education_level,
-        age_min=age_min,
-        gender=gender,
-        work_experience=work_experience,
-        canada_workex=canada_workex,
-        dep_num=dep_num,
-        canada_born=canada_born,
-        citizen_status=citizen_status,
-        fluent_english=fluent_english,
-        reading_english_scale=reading_english_scale,
-        speaking_english_scale=speaking_english_scale,
-        writing_english_scale=writing_english_scale,
-        numeracy_scale=numeracy_scale,
-        computer_scale=computer_scale,
-        transportation_bool=transportation_bool,
-        caregiver_bool=caregiver_bool,
-        housing=housing,
-        income_source=income_source,
-        felony_bool=felony_bool,
-        attending_school=attending_school,
-        substance_use=substance_use,
-        time_unemployed=time_unemployed,
-        need_mental_health_support_bool=need_mental_health_support_bool
-    )
+    return await _search_results(db, criteria_query(**criteria), response, page)
+
+
+@router.get("/search/by-criteria/explain")
+async def explain_clients_by_criteria(
+    criteria: Dict[str, Any] = Depends(search_criteria),
+    _: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Show the database query plan for a criteria search"""
+    return await AsyncClientService.explain_clients_by_criteria(db, **criteria)
 
 
 @router.get("/search/by-services", response_model=List[ClientResponse])
 async def get_clients_by_services(
+        response: Response,
         employment_assistance: Optional[bool] = None,
         life_stabilization: Optional[bool] = None,
         retention_services: Optional[bool] = None,
@@ -117,12 +347,12 @@ async def get_clients_by_services(
         employment_related_financial_supports: Optional[bool] = None,
         employer_financial_supports: Optional[bool] = None,
         enhanced_referrals: Optional[bool] = None,
+        page: Dict[str, Any] = Depends(search_page),
         _: User = Depends(get_admin_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Get clients filtered by multiple service statuses"""
-    return ClientService.get_clients_by_services(
-        db,
+    query = services_query(
         employment_assistance=employment_assistance,
         life_stabilization=life_stabilization,
         retention_services=retention_services,
@@ -131,46 +361,55 @@ async def get_clients_by_services(
         employer_financial_supports=employer_financial_supports,
         enhanced_referrals=enhanced_referrals
     )
+    return await _search_results(db, query, response, page)
 
 
 @router.get("/{client_id}/services", response_model=List[ServiceResponse])
 async def get_client_services(
         client_id: int,
         _: User = Depends(get_admin_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Get all services and their status for a specific client, including case worker info"""
-    return ClientService.get_client_services(db, client_id)
+    return await AsyncClientService.get_client_services(db, client_id)
 
 
 @router.get("/search/success-rate", response_model=List[ClientResponse])
 async def get_clients_by_success_rate(
+        response: Response,
         min_rate: int = Query(70, ge=0, le=100, description="Minimum success rate percentage"),
+        page: Dict[str, Any] = Depends(search_page),
         _: User = Depends(get_admin_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Get clients with success rate above specified threshold"""
-    return ClientService.get_clients_by_success_rate(db, min_rate)
+    return await _search_results(db, success_rate_query(min_rate), response, page)
 
 
 @router.get("/case-worker/{case_worker_id}", response_model=List[ClientResponse])
 async def get_clients_by_case_worker(
         case_worker_id: int,
+        response: Response,
+        page: Dict[str, Any] = Depends(search_page),
         _: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    return ClientService.get_clients_by_case_worker(db, case_worker_id)
+    await AsyncClientService.get_case_worker(db, case_worker_id)
+    return await _search_results(db, case_worker_query(case_worker_id), response, page)
 
 
 @router.put("/{client_id}", response_model=ClientResponse)
 async def update_client(
         client_id: int,
         client_data: ClientUpdate,
+        background_tasks: BackgroundTasks,
         _: User = Depends(get_admin_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Update a client's information"""
-    return ClientService.update_client(db, client_id, client_data)
+    client = await AsyncClientService.update_client(db, client_id, client_data)
+    background_tasks.add_task(AsyncPredictionService.refresh_in_background, [client_id])
+    return client
 
 
 @router.put("/{client_id}/services/{user_id}", response_model=ServiceResponse)
@@ -179,9 +418,9 @@ async def update_client_services(
         user_id: int,
         service_update: ServiceUpdate,
         _: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    return ClientService.update_client_services(db, client_id, user_id, service_update)
+    return await AsyncClientService.update_client_services(db, client_id, user_id, service_update)
 
 
 @router.post("/{client_id}/case-assignment", response_model=ServiceResponse)
@@ -189,136 +428,100 @@ async def create_case_assignment(
         client_id: int,
         case_worker_id: int = Query(..., description="Case worker ID to assign"),
         _: User = Depends(get_admin_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new case assignment for a client with a case worker"""
-    return ClientService.create_case_assignment(db, client_id, case_worker_id)
+    return await AsyncClientService.create_case_assignment(db, client_id, case_worker_id)
 
 
 @router.delete("/{client_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_client(
         client_id: int,
         _: User = Depends(get_admin_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a client"""
-    ClientService.delete_client(db, client_id)
+    await AsyncClientService.delete_client(db, client_id)
     return None
 
 
 @router.get("/models/current", response_model=Dict[str, str])
 async def get_current_model():
     """Get the name and type of the currently active model."""
-    from app.clients.service import logic
-    model_type = type(logic.MODEL).__name__
-    model_type_to_name = {
-        "RandomForestRegressor": "random_forest",
-        "LinearRegression": "linear_regression",
-        "GradientBoostingRegressor": "gradient_boost"
-    }
-    model_name = model_type_to_name.get(model_type, model_type.lower())
-    return {
-        "name": model_name,
-        "type": model_type
-    }
+    # The first call may unpickle the model, which must not block the event loop
+    return await run_in_threadpool(_current_model_info)
 
 
 @router.get("/models/available", response_model=List[Dict[str, str]])
 async def get_available_models():
     """Get list of available models with their types."""
-    available_models = [
-        {
-            "name": "random_forest",
-            "type": "RandomForestRegressor"
-        },
-        {
-            "name": "linear_regression",
-            "type": "LinearRegression"
-        },
-        {
-            "name": "gradient_boost",
-            "type": "GradientBoostingRegressor"
-        }
+    return [
+        {"name": name, "type": model_type}
+        for name, model_type in MODEL_REGISTRY.models.items()
     ]
-    return available_models
+
+@router.get("/models/shadow")
+async def get_shadow_model_stats():
+    """Get agreement statistics between the shadow model and served predictions."""
+    return SHADOW_SCORER.stats()
+
+
+@router.put("/models/shadow/{model_name}")
+async def set_shadow_model(model_name: str):
+    """Start shadow scoring live traffic with a registered model, resetting its statistics."""
+    _validate_model_name(model_name)
+    SHADOW_SCORER.set_model(model_name)
+    return SHADOW_SCORER.stats()
+
+
+@router.delete("/models/shadow", status_code=status.HTTP_204_NO_CONTENT)
+async def disable_shadow_model():
+    """Stop shadow scoring."""
+    SHADOW_SCORER.set_model(None)
+    return None
+
 
 @router.put("/models/current/{model_name}", response_model=Dict[str, str])
-async def set_current_model(model_name: str):
-    """Set the current model to use."""
+async def set_current_model(model_name: str, background_tasks: BackgroundTasks):
+    """Set the current model to use and recompute stored client predictions for it."""
     import logging
     logger = logging.getLogger("uvicorn")
 
-    # Get available models
     logger.info(f"Attempting to switch to model: {model_name}")
-    available_models = await get_available_models()
-    model_names = [model["name"] for model in available_models]
-    logger.info(f"Available models: {model_names}")
-
-    # Validate model name
-    if model_name not in model_names:
-        logger.error(f"Model '{model_name}' not found in available models")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Model '{model_name}' not found. Available models: {model_names}"
-        )
+    _validate_model_name(model_name)
 
     try:
-        # Check current model type
+        # If the current model is already the requested type, return early
         from app.clients.service import logic
-        current_model_type = type(logic.MODEL).__name__
+        current_model_type = model_type_name(await run_in_threadpool(logic.get_model))
         logger.info(f"Current model type: {current_model_type}")
-
-        # Get the expected model type for the requested model
-        model_type = next((model["type"] for model in available_models if model["name"] == model_name), None)
-        if not model_type:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Model type not found for model '{model_name}'"
-            )
-
-        # If the current model is already the requested type, return early
-        if current_model_type == model_type:
+        if current_model_type == MODEL_REGISTRY.models[model_name]:
+            if MODEL_REGISTRY.set_active_name(model_name):
+                background_tasks.add_task(
+                    AsyncPredictionService.refresh_in_background, None, model_name
+                )
             return {
                 "name": model_name,
                 "type": current_model_type
             }
 
-        # Build model path
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, 'service', f'{model_name}.pkl')
-        logger.info(f"Looking for model at: {model_path}")
-
-        # Check if file exists
-        if not os.path.exists(model_path):
-            logger.error(f"Model file not found at: {model_path}")
-            # Try to list files in directory
-            service_dir = os.path.join(current_dir, 'service')
-            if os.path.exists(service_dir):
-                files = os.listdir(service_dir)
-                logger.info(f"Files in service directory: {files}")
-
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Model file '{model_name}.pkl' not found"
-            )
-
-        # Load model
-        import pickle
-        logger.info(f"Loading model from: {model_path}")
-        with open(model_path, "rb") as model_file:
-            new_model = pickle.load(model_file)
-
-        logger.info(f"Loaded model type: {type(new_model).__name__}")
-
-        # Update the MODEL variable
-        logic.MODEL = new_model
+        # Loading (first use only) happens in the worker pool; the swap itself is atomic
+        new_model = await PREDICTION_EXECUTOR.run(MODEL_REGISTRY.activate, model_name)
         logger.info("Model successfully updated")
+        background_tasks.add_task(AsyncPredictionService.refresh_in_background, None, model_name)
 
         return {
             "name": model_name,
-            "type": type(new_model).__name__
+            "type": model_type_name(new_model)
         }
+    except FileNotFoundError as e:
+        logger.error(f"Model file not found at: {MODEL_REGISTRY.model_path(model_name)}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Model file '{model_name}.pkl' not found"
+        ) from e
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         logger.error(f"Error setting model: {str(e)}")
@@ -5,7 +5,8 @@ Defines schemas for client data, predictions, and API responses.
 
 # Standard library imports
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List
+from datetime import datetime
+from typing import Optional, List, Tuple
 from enum import IntEnum
 from app.models import UserRole
 
@@ -44,6 +45,20 @@ class PredictionInput(BaseModel):
     time_unemployed: int
     need_mental_health_support_bool: str
 
+class WhatIfFeature(BaseModel):
+    """A feature to vary and the values to try for it."""
+    name: str = Field(description="Feature column to vary, e.g. numeracy_scale")
+    values: List[float] = Field(min_length=1, description="Values to try for the feature")
+
+class WhatIfRequest(BaseModel):
+    """
+    Schema for a what-if sensitivity request: a client and one or two features
+    whose values are varied over a grid.
+    """
+    client: PredictionInput
+    features: List[WhatIfFeature] = Field(min_length=1, max_length=2)
+    include_interventions: bool = False
+
 class ClientBase(BaseModel):
     age: int = Field(ge=18, description="Age of client, must be 18 or older")
     gender: Gender = Field(description="Gender: 1 for male, 2 for female")
@@ -160,3 +175,16 @@ class ServiceUpdate(BaseModel):
 class ClientListResponse(BaseModel):
     clients: List[ClientResponse]
     total: int
+    # Pass as after_id to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+class ClientPredictionResponse(BaseModel):
+    client_id: int
+    model_name: str
+    baseline: float
+    interventions: List[Tuple[float, List[str]]]
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+        protected_namespaces = ()
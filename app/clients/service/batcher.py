@@ -0,0 +1,137 @@
+"""
+Micro-batching module for prediction requests.
+Collects concurrent single-client predictions for a short window and scores
+them together so each model call works on a larger stacked matrix.
+"""
+
+# Standard library imports
+import asyncio
+import bisect
+import threading
+import time
+
+# Local imports
+from app.config import settings
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+BATCH_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count for a stream of observations."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Record one observation."""
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """
+        Return the histogram state.
+
+        Returns:
+            dict: Cumulative counts per upper bound ("+Inf" last), sum and count
+        """
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets + ("+Inf",), self._counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {"buckets": buckets, "sum": self._sum, "count": cumulative}
+
+
+class MicroBatcher:
+    """
+    Groups concurrent submissions into batches.
+
+    The first submission of a batch starts a window_seconds timer; the batch
+    is processed when the timer fires or max_batch_size items are waiting,
+    whichever comes first. process_batch is an async callable that takes the
+    list of items and returns their results in the same order; each caller
+    gets its own result or the batch's exception.
+    """
+
+    def __init__(self, process_batch, window_seconds=0.002, max_batch_size=32):
+        self.process_batch = process_batch
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.batch_latency = Histogram(BATCH_LATENCY_BUCKETS)
+        self._items = []
+        self._timer = None
+        self._loop = None
+        self._tasks = set()
+
+    async def submit(self, item):
+        """
+        Queue an item for the next batch and wait for its result.
+
+        Args:
+            item: Input for process_batch
+
+        Returns:
+            The result process_batch produced for this item
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._items = []
+            self._timer = None
+        future = loop.create_future()
+        self._items.append((item, future))
+        if len(self._items) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        return await future
+
+    def _flush(self):
+        """Hand the waiting items to a background task."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._items = self._items, []
+        if items:
+            task = asyncio.ensure_future(self._run(items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items):
+        """Process one batch and fan its results back out to the callers."""
+        started = time.perf_counter()
+        try:
+            results = await self.process_batch([item for item, _ in items])
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.batch_sizes.observe(len(items))
+            self.batch_latency.observe(time.perf_counter() - started)
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        """
+        Return batch size and latency histograms for monitoring.
+
+        Returns:
+            dict: Batcher settings and histogram snapshots
+        """
+        return {
+            "enabled": settings.prediction_microbatch_enabled,
+            "window_seconds": self.window_seconds,
+            "max_batch_size": self.max_batch_size,
+            "batch_size": self.batch_sizes.snapshot(),
+            "batch_latency_seconds": self.batch_latency.snapshot()
+        }
@@ -0,0 +1,254 @@
+"""
+Prediction benchmark module.
+Measures latency percentiles and throughput of the prediction path for every
+registered model and batch size, times the /clients/predictions route through
+the ASGI app in-process, and compares results against a stored baseline.
+
+Usage:
+    python -m app.clients.service.benchmark --output bench.json
+    python -m app.clients.service.benchmark --baseline bench.json --threshold 0.2
+"""
+
+# Standard library imports
+import argparse
+import json
+import random
+import sys
+import time
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from app.clients.schema import PredictionInput
+from app.clients.service import logic
+from app.clients.service.encoder import ENCODER
+from app.clients.service.registry import MODEL_REGISTRY
+
+BATCH_SIZES = (1, 32, 1024)
+PERCENTILES = (50, 95, 99)
+# Timing statistic compared against the baseline
+REGRESSION_METRIC = "p95_ms"
+
+
+def sample_inputs(count, seed=0):
+    """
+    Generate valid raw prediction inputs.
+
+    Args:
+        count (int): Number of inputs
+        seed (int): Random seed, so runs score the same clients
+
+    Returns:
+        list: Raw input dicts in the shape of PredictionInput
+    """
+    rng = random.Random(seed)
+    inputs = []
+    for _ in range(count):
+        record = {}
+        for name, field in PredictionInput.model_fields.items():
+            if name == "age":
+                record[name] = rng.randint(18, 65)
+            elif field.annotation is int:
+                record[name] = rng.randint(0, 10)
+            else:
+                record[name] = str(rng.randint(0, 5))
+        inputs.append(record)
+    return inputs
+
+
+def summarize(seconds, batch_size=1):
+    """
+    Summarize timed calls as latency percentiles and throughput.
+
+    Args:
+        seconds (list): Duration of each call in seconds
+        batch_size (int): Number of items handled per call
+
+    Returns:
+        dict: Latency percentiles in milliseconds and items per second
+    """
+    samples = np.asarray(seconds) * 1000
+    summary = {f"p{q}_ms": float(np.percentile(samples, q)) for q in PERCENTILES}
+    summary["mean_ms"] = float(samples.mean())
+    summary["throughput_per_s"] = float(batch_size * 1000 / samples.mean())
+    summary["calls"] = len(samples)
+    return summary
+
+
+def time_calls(func, repeats, warmup=1, setup=None):
+    """
+    Time repeated calls of func.
+
+    Args:
+        func: Callable to time, called without arguments
+        repeats (int): Number of timed calls
+        warmup (int): Number of untimed calls first
+        setup: Optional callable run untimed before every call
+
+    Returns:
+        list: Duration of each timed call in seconds
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        func()
+    seconds = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def benchmark_stages(inputs, repeats):
+    """Time the per-client preprocessing stages on one input."""
+    record = inputs[0]
+    raw_data = logic.clean_input_data(record)
+    return {
+        "clean_input_data": summarize(time_calls(lambda: logic.clean_input_data(record), repeats)),
+        "create_matrix": summarize(time_calls(lambda: logic.create_matrix(raw_data), repeats)),
+        "encode_batch": {
+            str(len(inputs)): summarize(
+                time_calls(lambda: ENCODER.encode_batch(inputs), repeats), len(inputs)
+            )
+        }
+    }
+
+
+def benchmark_models(inputs, model_names, batch_sizes, repeats):
+    """
+    Time uncached scoring for each model and batch size.
+
+    Args:
+        inputs (list): Raw inputs, at least max(batch_sizes) long
+        model_names (list): Registered models to benchmark
+        batch_sizes (iterable): Number of clients scored per call
+        repeats (int): Number of timed calls per model and batch size
+
+    Returns:
+        dict: Summaries keyed by model name, then batch size
+    """
+    results = {}
+    for model_name in model_names:
+        model = MODEL_REGISTRY.get(model_name)
+        results[model_name] = {}
+        for batch_size in batch_sizes:
+            batch = inputs[:batch_size]
+            seconds = time_calls(
+                lambda: logic.interpret_and_calculate_batch(batch, model=model, use_cache=False),
+                repeats
+            )
+            results[model_name][str(batch_size)] = summarize(seconds, batch_size)
+    return results
+
+
+def benchmark_route(inputs, repeats):
+    """
+    Time POST /clients/predictions end to end through the ASGI app, in-process.
+
+    The prediction cache is cleared before every call so each request is scored.
+    """
+    # Imported here so the model benchmarks do not need the web stack
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        record = inputs[0]
+        seconds = time_calls(
+            lambda: client.post("/clients/predictions", json=record).raise_for_status(),
+            repeats,
+            setup=logic.PREDICTION_CACHE.clear
+        )
+    return summarize(seconds)
+
+
+def run_benchmarks(model_names=None, batch_sizes=BATCH_SIZES, repeats=20, include_route=True):
+    """
+    Run the full benchmark suite.
+
+    Args:
+        model_names (list): Registered models to benchmark, defaults to all
+        batch_sizes (iterable): Batch sizes to time scoring at
+        repeats (int): Number of timed calls per measurement
+        include_route (bool): Whether to time the HTTP route as well
+
+    Returns:
+        dict: Results keyed by "stages", "models" and "route"
+    """
+    model_names = MODEL_REGISTRY.names() if model_names is None else model_names
+    inputs = sample_inputs(max(batch_sizes))
+    results = {
+        "stages": benchmark_stages(inputs, repeats),
+        "models": benchmark_models(inputs, model_names, batch_sizes, repeats)
+    }
+    if include_route:
+        results["route"] = benchmark_route(inputs, repeats)
+    return results
+
+
+def _flatten(results, prefix=""):
+    """Map each summary in a nested results dict to its slash-separated path."""
+    if REGRESSION_METRIC in results:
+        return {prefix: results}
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}/{key}" if prefix else key))
+    return flat
+
+
+def compare_to_baseline(results, baseline, threshold=0.2):
+    """
+    Find measurements that got slower than the baseline.
+
+    Args:
+        results (dict): Current benchmark results
+        baseline (dict): Stored benchmark results
+        threshold (float): Allowed relative slowdown, 0.2 means 20%
+
+    Returns:
+        list: (measurement, baseline value, current value) for every regression;
+            measurements missing from either side are skipped
+    """
+    current = _flatten(results)
+    regressions = []
+    for name, previous in _flatten(baseline).items():
+        if name not in current:
+            continue
+        before = previous[REGRESSION_METRIC]
+        after = current[name][REGRESSION_METRIC]
+        if after > before * (1 + threshold):
+            regressions.append((name, before, after))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the prediction path")
+    parser.add_argument("--models", nargs="*", help="Models to benchmark, defaults to all")
+    parser.add_argument("--batch-sizes", nargs="*", type=int, default=list(BATCH_SIZES))
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--skip-route", action="store_true", help="Do not time the HTTP route")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results stored in this file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help=f"Allowed relative {REGRESSION_METRIC} slowdown over the baseline")
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmarks(
+        args.models, args.batch_sizes, args.repeats, include_route=not args.skip_route
+    )
+    for measurement, summary in _flatten(benchmark_results).items():
+        print(f"{measurement:45s} p50 {summary['p50_ms']:9.3f} ms  p95 {summary['p95_ms']:9.3f} ms  "
+              f"p99 {summary['p99_ms']:9.3f} ms  {summary['throughput_per_s']:10.1f}/s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(benchmark_results, output_file, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            found = compare_to_baseline(benchmark_results, json.load(baseline_file), args.threshold)
+        for measurement, before, after in found:
+            print(f"REGRESSION {measurement}: {REGRESSION_METRIC} {before:.3f} -> {after:.3f} ms")
+        sys.exit(1 if found else 0)
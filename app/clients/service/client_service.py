@@ -3,12 +3,165 @@ Client service module handling all database operations for clients.
 Provides CRUD operations and business logic for client management.
 """
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import delete, select
 from fastapi import HTTPException, status
-from typing import List, Optional, Dict, Any
-from app.models import Client, ClientCase, User
+from typing import Optional, Any
+from app.models import Client, ClientCase, ClientPrediction, User
 from app.clients.schema import ClientUpdate, ServiceUpdate, ServiceResponse
+from app.clients.service.pagination import (
+    client_total,
+    client_total_sync,
+    keyset_page,
+    split_page
+)
+from app.clients.service.query_planner import explain_statement, order_by_selectivity, plan_lines
+
+
+def criteria_conditions(
+    employment_status: Optional[bool] = None,
+    education_level: Optional[int] = None,
+    age_min: Optional[int] = None,
+    gender: Optional[int] = None,
+    work_experience: Optional[int] = None,
+    canada_workex: Optional[int] = None,
+    dep_num: Optional[int] = None,
+    canada_born: Optional[bool] = None,
+    citizen_status: Optional[bool] = None,
+    fluent_english: Optional[bool] = None,
+    reading_english_scale: Optional[int] = None,
+    speaking_english_scale: Optional[int] = None,
+    writing_english_scale: Optional[int] = None,
+    numeracy_scale: Optional[int] = None,
+    computer_scale: Optional[int] = None,
+    transportation_bool: Optional[bool] = None,
+    caregiver_bool: Optional[bool] = None,
+    housing: Optional[int] = None,
+    income_source: Optional[int] = None,
+    felony_bool: Optional[bool] = None,
+    attending_school: Optional[bool] = None,
+    substance_use: Optional[bool] = None,
+    time_unemployed: Optional[int] = None,
+    need_mental_health_support_bool: Optional[bool] = None
+):
+    """
+    Validate search criteria and build the filter conditions for the ones that are set,
+    most selective first (see query_planner.order_by_selectivity)
+    """
+    if education_level is not None and not (1 <= education_level <= 14):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Education level must be between 1 and 14"
+        )
+
+    if age_min is not None and age_min < 18:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Minimum age must be at least 18"
+        )
+
+    if gender is not None and gender not in [1, 2]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Gender must be 1 or 2"
+        )
+
+    # Apply filters
+    filters = {
+        Client.currently_employed: employment_status,
+        Client.age: (lambda x: x >= age_min) if age_min is not None else None,
+        Client.gender: gender,
+        Client.level_of_schooling: education_level,
+        Client.work_experience: work_experience,
+        Client.canada_workex: canada_workex,
+        Client.dep_num: dep_num,
+        Client.canada_born: canada_born,
+        Client.citizen_status: citizen_status,
+        Client.fluent_english: fluent_english,
+        Client.reading_english_scale: reading_english_scale,
+        Client.speaking_english_scale: speaking_english_scale,
+        Client.writing_english_scale: writing_english_scale,
+        Client.numeracy_scale: numeracy_scale,
+        Client.computer_scale: computer_scale,
+        Client.transportation_bool: transportation_bool,
+        Client.caregiver_bool: caregiver_bool,
+        Client.housing: housing,
+        Client.income_source: income_source,
+        Client.felony_bool: felony_bool,
+        Client.attending_school: attending_school,
+        Client.substance_use: substance_use,
+        Client.time_unemployed: time_unemployed,
+        Client.need_mental_health_support_bool: need_mental_health_support_bool
+    }
+
+    conditions = []
+    for column, value in filters.items():
+        if callable(value):
+            conditions.append((column.key, value(column)))
+        elif value is not None:
+            conditions.append((column.key, column == value))
+    return order_by_selectivity(conditions)
+
+
+def validate_page(skip: int, limit: int):
+    """Reject negative offsets and empty pages"""
+    if skip < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Skip value cannot be negative"
+        )
+    if limit < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Limit must be greater than 0"
+        )
+
+
+def clients_page(skip: int, limit: int, after_id: Optional[str] = None):
+    """Build the query for one page of clients; with a cursor, skip is ignored"""
+    query = keyset_page(select(Client), limit, after_id)
+    return query if after_id is not None else query.offset(skip)
+
+
+def page_response(rows, limit: int, total: int):
+    """Build the client list response from rows fetched with clients_page"""
+    clients, next_cursor = split_page(rows, limit)
+    return {"clients": clients, "total": total, "next_cursor": next_cursor}
+
+
+def criteria_query(**criteria: Any):
+    """Select the clients matching search criteria (see criteria_conditions)"""
+    return select(Client).where(*criteria_conditions(**criteria))
+
+
+def services_query(**service_filters: Optional[bool]):
+    """
+    Select the clients with a case matching every service status that is set.
+
+    The case filters are an EXISTS subquery rather than a join, so a client
+    with several matching cases is returned once, as Query.join did.
+    """
+    return select(Client).where(Client.cases.any(**{
+        service_name: service_status
+        for service_name, service_status in service_filters.items()
+        if service_status is not None
+    }))
+
+
+def success_rate_query(min_rate: int = 70):
+    """Select the clients with a case at or above a success rate percentage"""
+    if not (0 <= min_rate <= 100):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Success rate must be between 0 and 100"
+        )
+    return select(Client).where(Client.cases.any(ClientCase.success_rate >= min_rate))
+
+
+def case_worker_query(case_worker_id: int):
+    """Select the clients assigned to a case worker"""
+    return select(Client).where(Client.cases.any(ClientCase.user_id == case_worker_id))
 
 
 class ClientService:
@@ -24,25 +177,16 @@ class ClientService:
         return client
 
     @staticmethod
-    def get_clients(db: Session, skip: int = 0, limit: int = 50):
+    def get_clients(db: Session, skip: int = 0, limit: int = 50, after_id: Optional[str] = None):
         """
         Get clients with optional pagination.
         Default shows first 50 clients, which means you'd need 3 pages for 150 records.
+        Passing the previous page's next_cursor as after_id continues from there
+        without scanning the skipped rows (see clients_page).
         """
-        if skip < 0:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Skip value cannot be negative"
-            )
-        if limit < 1:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Limit must be greater than 0"
-            )
-
-        clients = db.query(Client).offset(skip).limit(limit).all()
-        total = db.query(Client).count()
-        return {"clients": clients, "total": total}
+        validate_page(skip, limit)
+        rows = db.scalars(clients_page(skip, limit, after_id)).all()
+        return page_response(rows, limit, client_total_sync(db))
 
     @staticmethod
     def get_clients_by_criteria(
@@ -73,59 +217,33 @@ class ClientService:
         need_mental_health_support_bool: Optional[bool] = None
     ):
         """Get clients filtered by any combination of criteria"""
-        query = db.query(Client)
-
-        if education_level is not None and not (1 <= education_level <= 14):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Education level must be between 1 and 14"
-            )
-
-        if age_min is not None and age_min < 18:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Minimum age must be at least 18"
-            )
-
-        if gender is not None and gender not in [1, 2]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Gender must be 1 or 2"
-            )
-
-        # Apply filters
-        filters = {
-            Client.currently_employed: employment_status,
-            Client.age: (lambda x: x >= age_min) if age_min is not None else None,
-            Client.gender: gender,
-            Client.level_of_schooling: education_level,
-            Client.work_experience: work_experience,
-            Client.canada_workex: canada_workex,
-            Client.dep_num: dep_num,
-            Client.canada_born: canada_born,
-            Client.citizen_status: citizen_status,
-            Client.fluent_english: fluent_english,
-            Client.reading_english_scale: reading_english_scale,
-            Client.speaking_english_scale: speaking_english_scale,
-            Client.writing_english_scale: writing_english_scale,
-            Client.numeracy_scale: numeracy_scale,
-            Client.computer_scale: computer_scale,
-            Client.transportation_bool: transportation_bool,
-            Client.caregiver_bool: caregiver_bool,
-            Client.housing: housing,
-            Client.income_source: income_source,
-            Client.felony_bool: felony_bool,
-            Client.attending_school: attending_school,
-            Client.substance_use: substance_use,
-            Client.time_unemployed: time_unemployed,
-            Client.need_mental_health_support_bool: need_mental_health_support_bool
-        }
-
-        for column, value in filters.items():
-            if callable(value):
-                query = query.filter(value(column))
-            elif value is not None:
-                query = query.filter(column == value)
+        conditions = criteria_conditions(
+            employment_status=employment_status,
+            education_level=education_level,
+            age_min=age_min,
+            gender=gender,
+            work_experience=work_experience,
+            canada_workex=canada_workex,
+            dep_num=dep_num,
+            canada_born=canada_born,
+            citizen_status=citizen_status,
+            fluent_english=fluent_english,
+            reading_english_scale=reading_english_scale,
+            speaking_english_scale=speaking_english_scale,
+            writing_english_scale=writing_english_scale,
+            numeracy_scale=numeracy_scale,
+            computer_scale=computer_scale,
+            transportation_bool=transportation_bool,
+            caregiver_bool=caregiver_bool,
+            housing=housing,
+            income_source=income_source,
+            felony_bool=felony_bool,
+            attending_school=attending_school,
+            substance_use=substance_use,
+            time_unemployed=time_unemployed,
+            need_mental_health_support_bool=need_mental_health_support_bool
+        )
+        query = db.query(Client).filter(*conditions)
 
         try:
             return query.all()
@@ -205,6 +323,10 @@ class ClientService:
             setattr(client, field, value)
 
         try:
+            # Stored predictions are stale now; they are recomputed in the background
+            db.query(ClientPrediction).filter(
+                ClientPrediction.client_id == client_id
+            ).delete()
             db.commit()
             db.refresh(client)
             return client
@@ -316,6 +438,9 @@ class ClientService:
             db.query(ClientCase).filter(
                 ClientCase.client_id == client_id
             ).delete()
+            db.query(ClientPrediction).filter(
+                ClientPrediction.client_id == client_id
+            ).delete()
 
             db.delete(client)
             db.commit()
@@ -326,3 +451,275 @@ class ClientService:
                 detail=f"Failed to delete client: {str(e)}"
             ) from e
 
+
+
+class AsyncClientService:
+    """
+    Async counterparts of the ClientService operations for request handlers.
+    They run on an AsyncSession, so a slow query no longer blocks the event loop.
+    """
+
+    @staticmethod
+    async def get_client(db: AsyncSession, client_id: int):
+        """Get a specific client by ID"""
+        client = await db.get(Client, client_id)
+        if not client:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Client with id {client_id} not found"
+            )
+        return client
+
+    @staticmethod
+    async def get_clients(
+        db: AsyncSession, skip: int = 0, limit: int = 50, after_id: Optional[str] = None
+    ):
+        """Get clients with optional offset or cursor pagination."""
+        validate_page(skip, limit)
+        rows = (await db.scalars(clients_page(skip, limit, after_id))).all()
+        return page_response(rows, limit, await client_total(db))
+
+    @staticmethod
+    async def get_clients_by_criteria(db: AsyncSession, **criteria: Any):
+        """Get clients filtered by any combination of criteria (see criteria_conditions)"""
+        query = criteria_query(**criteria)
+        try:
+            return (await db.scalars(query)).all()
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error retrieving clients: {str(e)}"
+            ) from e
+
+    @staticmethod
+    async def explain_clients_by_criteria(db: AsyncSession, **criteria: Any):
+        """
+        Show how the database runs a criteria search, to check which index it uses.
+
+        Returns:
+            dict: The search SQL with its parameters inlined and the plan steps
+        """
+        query = criteria_query(**criteria)
+        dialect = db.bind.dialect
+        sql, statement = explain_statement(query, dialect)
+        rows = (await db.execute(statement)).all()
+        return {"sql": sql, "plan": plan_lines(rows, dialect.name)}
+
+    @staticmethod
+    async def get_clients_by_services(db: AsyncSession, **service_filters: Optional[bool]):
+        """Get clients filtered by multiple service statuses."""
+        query = services_query(**service_filters)
+        try:
+            return (await db.scalars(query)).all()
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error retrieving clients: {str(e)}"
+            ) from e
+
+    @staticmethod
+    async def get_client_services(db: AsyncSession, client_id: int):
+        """Get all services for a specific client with case worker info"""
+        client_cases = (await db.scalars(
+            select(ClientCase).where(ClientCase.client_id == client_id)
+        )).all()
+        if not client_cases:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No services found for client with id {client_id}"
+            )
+        return client_cases
+
+    @staticmethod
+    async def get_clients_by_success_rate(db: AsyncSession, min_rate: int = 70):
+        """Get clients with success rate at or above the specified percentage"""
+        return (await db.scalars(success_rate_query(min_rate))).all()
+
+    @staticmethod
+    async def get_case_worker(db: AsyncSession, case_worker_id: int):
+        """Get a case worker by ID"""
+        case_worker = await db.get(User, case_worker_id)
+        if not case_worker:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Case worker with id {case_worker_id} not found"
+            )
+        return case_worker
+
+    @staticmethod
+    async def get_clients_by_case_worker(db: AsyncSession, case_worker_id: int):
+        """Get all clients assigned to a specific case worker"""
+        await AsyncClientService.get_case_worker(db, case_worker_id)
+        return (await db.scalars(case_worker_query(case_worker_id))).all()
+
+    @staticmethod
+    async def get_clients_page(
+        db: AsyncSession, query, limit: Optional[int] = None, after_id: Optional[str] = None
+    ):
+        """
+        Get one page of a client search in id order.
+
+        Args:
+            db: Database session
+            query: Client search, e.g. from criteria_query
+            limit: Page size, or None for every remaining client
+            after_id: Cursor of the previous page
+
+        Returns:
+            tuple: (clients, cursor of the next page or None on the last page)
+        """
+        query = keyset_page(query, limit, after_id)
+        try:
+            rows = (await db.scalars(query)).all()
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error retrieving clients: {str(e)}"
+            ) from e
+        return split_page(rows, limit)
+
+    @staticmethod
+    async def stream_clients(
+        db: AsyncSession,
+        query,
+        limit: Optional[int] = None,
+        after_id: Optional[str] = None,
+        chunk_size: int = 500
+    ):
+        """
+        Yield the clients of a search in id order, chunk_size at a time.
+
+        Rows are fetched with yield_per from a server-side cursor, so only one
+        chunk of clients is in memory however many match.
+        """
+        result = await db.stream_scalars(
+            keyset_page(query, limit, after_id),
+            execution_options={"yield_per": chunk_size}
+        )
+        remaining = limit
+        async for clients in result.partitions():
+            if remaining is not None:
+                # keyset_page fetches one extra row to detect a next page
+                clients = clients[:remaining]
+                remaining -= len(clients)
+            if clients:
+                yield clients
+
+    @staticmethod
+    async def update_client(db: AsyncSession, client_id: int, client_update: ClientUpdate):
+        """Update a client's information"""
+        client = await AsyncClientService.get_client(db, client_id)
+
+        update_data = client_update.model_dump(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(client, field, value)
+
+        try:
+            # Stored predictions are stale now; they are recomputed in the background
+            await db.execute(
+                delete(ClientPrediction).where(ClientPrediction.client_id == client_id)
+            )
+            await db.commit()
+            await db.refresh(client)
+            return client
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to update client: {str(e)}"
+            ) from e
+
+    @staticmethod
+    async def update_client_services(
+        db: AsyncSession,
+        client_id: int,
+        user_id: int,
+        service_update: ServiceUpdate
+    ):
+        """Update a client's services and outcomes for a specific case worker"""
+        client_case = await db.get(ClientCase, (client_id, user_id))
+
+        if not client_case:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No case found for client {client_id} with case worker {user_id}. "
+                       f"Cannot update services for a non-existent case assignment."
+            )
+
+        update_data = service_update.model_dump(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(client_case, field, value)
+
+        try:
+            await db.commit()
+            await db.refresh(client_case)
+            return client_case
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to update client services: {str(e)}"
+            ) from e
+
+    @staticmethod
+    async def create_case_assignment(db: AsyncSession, client_id: int, case_worker_id: int):
+        """Create a new case assignment"""
+        await AsyncClientService.get_client(db, client_id)
+
+        case_worker = await db.get(User, case_worker_id)
+        if not case_worker:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Case worker with id {case_worker_id} not found"
+            )
+
+        existing_case = await db.get(ClientCase, (client_id, case_worker_id))
+        if existing_case:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Client {client_id} already has a case assigned to case worker {case_worker_id}"
+            )
+
+        try:
+            new_case = ClientCase(
+                client_id=client_id,
+                user_id=case_worker_id,
+                employment_assistance=False,
+                life_stabilization=False,
+                retention_services=False,
+                specialized_services=False,
+                employment_related_financial_supports=False,
+                employer_financial_supports=False,
+                enhanced_referrals=False,
+                success_rate=0
+            )
+            db.add(new_case)
+            await db.commit()
+            await db.refresh(new_case)
+            return new_case
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to create case assignment: {str(e)}"
+            ) from e
+
+    @staticmethod
+    async def delete_client(db: AsyncSession, client_id: int):
+        """Delete a client and their associated records"""
+        client = await AsyncClientService.get_client(db, client_id)
+
+        try:
+            await db.execute(delete(ClientCase).where(ClientCase.client_id == client_id))
+            await db.execute(
+                delete(ClientPrediction).where(ClientPrediction.client_id == client_id)
+            )
+
+            await db.delete(client)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to delete client: {str(e)}"
+            ) from e
@@ -0,0 +1,140 @@
+"""
+Input encoding module.
+Maps raw assessment answers to the numeric feature layout the models expect,
+using lookup tables built once at import.
+"""
+
+# Third-party imports
+import numpy as np
+
+# Model feature columns, in the order the models were trained on
+FEATURE_COLUMNS = [
+    "age", "gender", "work_experience", "canada_workex", "dep_num",
+    "canada_born", "citizen_status", "level_of_schooling", "fluent_english",
+    "reading_english_scale", "speaking_english_scale", "writing_english_scale",
+    "numeracy_scale", "computer_scale", "transportation_bool", "caregiver_bool",
+    "housing", "income_source", "felony_bool", "attending_school",
+    "currently_employed", "substance_use", "time_unemployed",
+    "need_mental_health_support_bool"
+]
+
+# Text answers from the front end and their numeric codes
+CATEGORICAL_MAPPINGS = [
+    {
+        "": 0, "true": 1, "false": 0, "no": 0, "yes": 1,
+        "No": 0, "Yes": 1
+    },
+    {
+        "Grade 0-8": 1, "Grade 9": 2, "Grade 10": 3, "Grade 11": 4,
+        "Grade 12 or equivalent": 5, "OAC or Grade 13": 6,
+        "Some college": 7, "Some university": 8, "Some apprenticeship": 9,
+        "Certificate of Apprenticeship": 10, "Journeyperson": 11,
+        "Certificate/Diploma": 12, "Bachelor's degree": 13,
+        "Post graduate": 14
+    },
+    {
+        "Renting-private": 1, "Renting-subsidized": 2,
+        "Boarding or lodging": 3, "Homeowner": 4,
+        "Living with family/friend": 5, "Institution": 6,
+        "Temporary second residence": 7, "Band-owned home": 8,
+        "Homeless or transient": 9, "Emergency hostel": 10
+    },
+    {
+        "No Source of Income": 1, "Employment Insurance": 2,
+        "Workplace Safety and Insurance Board": 3,
+        "Ontario Works applied or receiving": 4,
+        "Ontario Disability Support Program applied or receiving": 5,
+        "Dependent of someone receiving OW or ODSP": 6, "Crown Ward": 7,
+        "Employment": 8, "Self-Employment": 9, "Other (specify)": 10
+    }
+]
+
+NUMERIC_TYPES = {int, float, bool}
+
+
+class InputEncoder:
+    """
+    Encoder from raw input dicts to feature arrays.
+
+    All categorical vocabularies are merged into one lookup table (earlier
+    mappings win, as in a sequential search). Text that is not in the table
+    encodes as its integer value when numeric and 0 otherwise. Batches are
+    encoded column by column: numeric columns are copied directly and text
+    columns are encoded once per distinct value.
+    """
+
+    def __init__(self, columns=None, mappings=None):
+        self.columns = list(FEATURE_COLUMNS if columns is None else columns)
+        self.codes = {}
+        for mapping in reversed(CATEGORICAL_MAPPINGS if mappings is None else mappings):
+            self.codes.update(mapping)
+
+    def encode_text(self, text_data):
+        """
+        Convert one text answer into its numeric value.
+
+        Args:
+            text_data (str): Text data to convert
+
+        Returns:
+            int: Converted numerical value
+        """
+        code = self.codes.get(text_data)
+        if code is not None:
+            return code
+        return int(text_data) if text_data.isnumeric() else 0
+
+    def encode_value(self, value):
+        """Encode a single field value, passing non-text values through."""
+        return self.encode_text(value) if isinstance(value, str) else value
+
+    def encode_record(self, input_data):
+        """
+        Encode one input dict.
+
+        Args:
+            input_data (dict): Raw input data from the client
+
+        Returns:
+            np.array: Feature row of shape (features,)
+        """
+        return np.array(
+            [self.encode_value(input_data[column]) for column in self.columns], dtype=float
+        )
+
+    def encode_column(self, values):
+        """
+        Encode all values of one column.
+
+        Args:
+            values (list): Raw values of the column, one per record
+
+        Returns:
+            np.array: Encoded column of shape (records,)
+        """
+        kinds = set(map(type, values))
+        if kinds <= NUMERIC_TYPES:
+            return np.fromiter(values, dtype=float, count=len(values))
+        if kinds == {str}:
+            uniques, inverse = np.unique(np.array(values, dtype=str), return_inverse=True)
+            codes = np.array([self.encode_text(text) for text in uniques.tolist()], dtype=float)
+            return codes[inverse]
+        return np.array([self.encode_value(value) for value in values], dtype=float)
+
+    def encode_batch(self, input_batch):
+        """
+        Encode many input dicts column by column.
+
+        Args:
+            input_batch (list): Raw input dicts, one per client
+
+        Returns:
+            np.array: Feature matrix of shape (records, features)
+        """
+        features = np.empty((len(input_batch), len(self.columns)))
+        for index, column in enumerate(self.columns):
+            features[:, index] = self.encode_column([item[column] for item in input_batch])
+        return features
+
+
+ENCODER = InputEncoder()
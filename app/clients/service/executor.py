@@ -0,0 +1,139 @@
+"""
+Prediction executor module.
+Runs CPU-bound prediction work in a bounded worker pool so it does not block
+the event loop that serves the other endpoints.
+"""
+
+# Standard library imports
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Third-party imports
+from fastapi import HTTPException, status
+
+# Local imports
+from app.config import settings
+
+
+class PredictionExecutor:
+    """
+    Bounded thread pool for prediction requests.
+
+    At most max_workers predictions run at once and at most max_queue more
+    wait for a worker; further requests are rejected with 503. A request that
+    does not finish within timeout seconds gets a 504 (work that already
+    started runs to completion in the background). Threads are used rather
+    than processes so that model swaps and the prediction cache stay shared.
+    """
+
+    def __init__(self, max_workers=4, max_queue=64, timeout=10.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _get_pool(self):
+        """Create the thread pool on first use."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="prediction"
+                )
+            return self._pool
+
+    def _task(self, submitted_at, func, args):
+        """Run func in a worker thread, recording how long it waited."""
+        waited = time.perf_counter() - submitted_at
+        with self._lock:
+            self.running += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def _release(self, _future):
+        """Free a queue slot once a task finishes or is cancelled."""
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, func, *args):
+        """
+        Run func(*args) in the worker pool and await its result.
+
+        Raises:
+            HTTPException: 503 when the queue is full, 504 on timeout
+        """
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Prediction queue is full, try again later"
+                )
+            self.pending += 1
+        try:
+            future = self._get_pool().submit(self._task, time.perf_counter(), func, args)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError as e:
+            with self._lock:
+                self.timeouts += 1
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=f"Prediction did not finish within {self.timeout} seconds"
+            ) from e
+
+    def stats(self):
+        """
+        Return pool counters for monitoring.
+
+        Returns:
+            dict: Queue depth, in-flight work and wait time statistics
+        """
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.pending - self.running,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "mean_wait_seconds": self.total_wait_seconds / started if started else 0.0,
+                "max_wait_seconds": self.max_wait_seconds
+            }
+
+    def shutdown(self):
+        """Stop the worker threads, letting queued work finish."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+PREDICTION_EXECUTOR = PredictionExecutor(
+    max_workers=settings.prediction_workers,
+    max_queue=settings.prediction_queue_size,
+    timeout=settings.prediction_timeout_seconds
+)
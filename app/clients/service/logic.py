@@ -5,15 +5,26 @@ Handles data cleaning, model predictions, and intervention combinations analysis
 
 # Standard library imports
 import os
+import threading
+from math import factorial
+import time
 #import json
 from itertools import product
 
 # Third-party imports
-import pickle
 import numpy as np
+from sklearn.linear_model import ElasticNet, Lasso, LinearRegression, Ridge
+
+# Local imports
+from app.config import settings
+from app.clients.service.cache import PredictionCache
+from app.clients.service.encoder import ENCODER, FEATURE_COLUMNS
+from app.clients.service.metrics import STAGE_TIMER
+from app.clients.service.model_store import load_model
+from app.clients.service.tree_engine import compile_model, model_type_name, unwrap_model
 
 # Constants
-COLUMN_INTERVENTIONS = [
+DEFAULT_INTERVENTIONS = [
     'Life Stabilization',
     'General Employment Assistance Services',
     'Retention Services',
@@ -22,12 +33,67 @@ COLUMN_INTERVENTIONS = [
     'Employer Financial Supports',
     'Enhanced Referrals for Skills Development'
 ]
+COLUMN_INTERVENTIONS = settings.interventions or DEFAULT_INTERVENTIONS
+
+# Maximum number of clients scored per model call in batch mode; each client
+# expands to one row per combination (128 by default), so this caps the
+# stacked matrix at roughly 8 MB.
+BATCH_CHUNK_SIZE = 256
 
-# Load model
+# Model location; the model itself is loaded lazily by get_model
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(CURRENT_DIR, 'model.pkl')
-with open(MODEL_PATH, "rb") as model_file:
-    MODEL = pickle.load(model_file)
+
+# Predictions within this relative distance of each other are ranked as ties,
+# so scorers that compute the same value with different rounding agree
+RANKING_TOLERANCE = 1e-9
+
+_model = None
+_model_lock = threading.Lock()
+
+def prepare_model(model):
+    """
+    Wrap a freshly loaded model for serving.
+
+    Args:
+        model: Fitted sklearn model
+
+    Returns:
+        The compiled tree engine when enabled and supported, otherwise the model
+    """
+    return compile_model(model) if settings.compiled_tree_inference else model
+
+def load_model_file(model_path):
+    """
+    Load a model for serving, memory-mapping its compiled artifact if present.
+
+    Args:
+        model_path (str): Path of the pickled sklearn model
+
+    Returns:
+        Model ready for prediction
+    """
+    return prepare_model(load_model(model_path, compiled=settings.compiled_tree_inference))
+
+def get_model():
+    """
+    Return the active model, loading MODEL_PATH on first use.
+
+    Returns:
+        Model ready for prediction
+    """
+    global _model  # pylint: disable=global-statement
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model_file(MODEL_PATH)
+    return _model
+
+def __getattr__(name):
+    """Resolve logic.MODEL lazily to the active model."""
+    if name == "MODEL":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def clean_input_data(input_data):
     """
@@ -39,23 +105,7 @@ def clean_input_data(input_data):
     Returns:
         list: Cleaned and formatted data ready for model input
     """
-    columns = [
-        "age", "gender", "work_experience", "canada_workex", "dep_num",
-        "canada_born", "citizen_status", "level_of_schooling", "fluent_english",
-        "reading_english_scale", "speaking_english_scale", "writing_english_scale",
-        "numeracy_scale", "computer_scale", "transportation_bool", "caregiver_bool",
-        "housing", "income_source", "felony_bool", "attending_school",
-        "currently_employed", "substance_use", "time_unemployed",
-        "need_mental_health_support_bool"
-    ]
-    demographics = {key: input_data[key] for key in columns}
-    output = []
-    for column in columns:
-        value = demographics.get(column, None)
-        if isinstance(value, str):
-            value = convert_text(value)  # Removed 'column' from here as it wasn't used
-        output.append(value)
-    return output
+    return [ENCODER.encode_value(input_data[column]) for column in FEATURE_COLUMNS]
 
 def convert_text(text_data: str):
     """
@@ -67,40 +117,7 @@ def convert_text(text_data: str):
     Returns:
         int: Converted numerical value
     """
-    categorical_mappings = [
-        {
-            "": 0, "true": 1, "false": 0, "no": 0, "yes": 1,
-            "No": 0, "Yes": 1
-        },
-        {
-            "Grade 0-8": 1, "Grade 9": 2, "Grade 10": 3, "Grade 11": 4,
-            "Grade 12 or equivalent": 5, "OAC or Grade 13": 6,
-            "Some college": 7, "Some university": 8, "Some apprenticeship": 9,
-            "Certificate of Apprenticeship": 10, "Journeyperson": 11,
-            "Certificate/Diploma": 12, "Bachelor's degree": 13,
-            "Post graduate": 14
-        },
-        {
-            "Renting-private": 1, "Renting-subsidized": 2,
-            "Boarding or lodging": 3, "Homeowner": 4,
-            "Living with family/friend": 5, "Institution": 6,
-            "Temporary second residence": 7, "Band-owned home": 8,
-            "Homeless or transient": 9, "Emergency hostel": 10
-        },
-        {
-            "No Source of Income": 1, "Employment Insurance": 2,
-            "Workplace Safety and Insurance Board": 3,
-            "Ontario Works applied or receiving": 4,
-            "Ontario Disability Support Program applied or receiving": 5,
-            "Dependent of someone receiving OW or ODSP": 6, "Crown Ward": 7,
-            "Employment": 8, "Self-Employment": 9, "Other (specify)": 10
-        }
-    ]
-    for category in categorical_mappings:
-        if text_data in category:
-            return category[text_data]
-
-    return int(text_data) if text_data.isnumeric() else 0
+    return ENCODER.encode_text(text_data)
 
 def create_matrix(row_data):
     """
@@ -112,8 +129,8 @@ def create_matrix(row_data):
     Returns:
         np.array: Matrix of all possible intervention combinations
     """
-    data = [row_data.copy() for _ in range(128)]
-    perms = intervention_permutations(7)
+    perms = intervention_permutations(len(COLUMN_INTERVENTIONS))
+    data = [row_data.copy() for _ in range(len(perms))]
     return np.concatenate((np.array(data), np.array(perms)), axis=1)
 
 def intervention_permutations(num):
@@ -138,7 +155,7 @@ def get_baseline_row(row_data):
     Returns:
         np.array: Baseline row with zeros for interventions
     """
-    base_interventions = np.zeros(7)
+    base_interventions = np.zeros(len(COLUMN_INTERVENTIONS))
     return np.concatenate((np.array(row_data), base_interventions))
 
 def intervention_row_to_names(row_data):
@@ -173,26 +190,500 @@ def process_results(baseline_pred, results_matrix):
         "interventions": result_list
     }
 
-def interpret_and_calculate(input_data):
+def shapley_weights(combinations):
+    """
+    Build the matrix that maps combination predictions to Shapley values.
+
+    Treating each combination's prediction as the value of that coalition of
+    interventions, intervention i's Shapley value is the weighted sum over
+    coalitions S without i of v(S + i) - v(S), with weight
+    |S|! (n - |S| - 1)! / n!. Each coalition therefore gets a positive weight
+    for the interventions it contains and a negative weight for the rest.
+
+    Args:
+        combinations (np.array): Every combination of interventions, one per row
+
+    Returns:
+        np.array: Weights of shape (interventions, combinations)
+    """
+    num_interventions = combinations.shape[1]
+    sizes = combinations.sum(axis=1).astype(int)
+    weight = np.array([
+        factorial(size) * factorial(num_interventions - size - 1) / factorial(num_interventions)
+        for size in range(num_interventions)
+    ])
+    included = weight[np.maximum(sizes - 1, 0)]
+    excluded = weight[np.minimum(sizes, num_interventions - 1)]
+    return np.where(combinations.T == 1, included, -excluded)
+
+def rank_ascending(predictions, tie_keys):
+    """
+    Order predictions from worst to best, treating near-equal ones as ties.
+
+    Sorted predictions closer than RANKING_TOLERANCE to their neighbour share
+    one value, and ties go to the larger tie key, so rounding differences
+    between scoring paths cannot reorder equal combinations.
+
+    Args:
+        predictions (np.array): Predictions to rank
+        tie_keys (np.array): Combination index of each prediction
+
+    Returns:
+        np.array: Positions into predictions, best last
+    """
+    order = np.argsort(predictions, kind="stable")
+    ordered = predictions[order]
+    tolerance = RANKING_TOLERANCE * max(1.0, float(np.max(np.abs(ordered))))
+    starts = np.concatenate(([True], np.diff(ordered) > tolerance))
+    snapped = ordered[np.maximum.accumulate(np.where(starts, np.arange(len(ordered)), 0))]
+    return order[np.lexsort((tie_keys[order], snapped))]
+
+
+class InterventionScorer:
+    """
+    Reusable kernel that ranks intervention combinations for client rows.
+
+    The combination block is built once. Each call broadcasts the client
+    features into a preallocated per-thread buffer, gets the baseline and all
+    combinations from a single predict (the all-zeros combination is row 0),
+    and picks the top-k rows with a partial selection instead of a full sort.
+    Predictions within RANKING_TOLERANCE are ties, and the later combination
+    ranks higher (see rank_ascending).
+    Since every combination is predicted, exact per-intervention Shapley
+    values come from the same predictions with no extra model calls.
+    """
+
+    def __init__(self, num_interventions=len(COLUMN_INTERVENTIONS), top_k=3):
+        self.combinations = intervention_permutations(num_interventions).astype(float)
+        self.num_combinations = len(self.combinations)
+        self.top_k = top_k
+        self.shapley_weights = shapley_weights(self.combinations)
+        # Row of the combination with only intervention i, for marginal uplifts
+        self.single_indices = np.array([
+            np.flatnonzero((self.combinations.sum(axis=1) == 1) & (self.combinations[:, i] == 1))[0]
+            for i in range(num_interventions)
+        ])
+        self._local = threading.local()
+
+    def _get_buffer(self, num_clients, num_features):
+        """Return a feature buffer for num_clients, growing it when too small."""
+        buffer = getattr(self._local, "buffer", None)
+        width = num_features + self.combinations.shape[1]
+        if buffer is None or buffer.shape[0] < num_clients or buffer.shape[2] != width:
+            buffer = np.empty((num_clients, self.num_combinations, width))
+            buffer[:, :, num_features:] = self.combinations
+            self._local.buffer = buffer
+        return buffer[:num_clients]
+
+    def build_matrix(self, raw_rows):
+        """
+        Fill the feature buffer for a block of clients.
+
+        Args:
+            raw_rows (np.array): Cleaned client rows, shape (clients, features)
+
+        Returns:
+            np.array: Matrix of shape (clients * combinations, features + interventions)
+        """
+        num_clients, num_features = raw_rows.shape
+        buffer = self._get_buffer(num_clients, num_features)
+        buffer[:, :, :num_features] = raw_rows[:, np.newaxis, :]
+        return buffer.reshape(num_clients * self.num_combinations, -1)
+
+    def predict(self, model, raw_rows):
+        """
+        Predict every combination for each client in one model call.
+
+        Returns:
+            np.array: Predictions of shape (clients, combinations)
+        """
+        with STAGE_TIMER.time("build_matrix", model):
+            matrix = self.build_matrix(raw_rows)
+        with STAGE_TIMER.time("predict", model):
+            return model.predict(matrix).reshape(len(raw_rows), self.num_combinations)
+
+    def top_k_indices(self, predictions):
+        """
+        Select the top-k combinations of one client, in ascending order.
+
+        Args:
+            predictions (np.array): Predictions for every combination of one client
+
+        Returns:
+            np.array: Indices of the top-k combinations, best last
+        """
+        cutoff = len(predictions) - self.top_k
+        threshold = np.partition(predictions, cutoff)[cutoff]
+        # Keep predictions tied with the threshold within tolerance as candidates
+        tolerance = RANKING_TOLERANCE * max(1.0, abs(float(threshold)))
+        candidates = np.flatnonzero(predictions >= threshold - tolerance)
+        order = rank_ascending(predictions[candidates], candidates)
+        return candidates[order[-self.top_k:]]
+
+    def attributions(self, predictions):
+        """
+        Attribute each client's predictions to the individual interventions.
+
+        Args:
+            predictions (np.array): Predictions of shape (clients, combinations)
+
+        Returns:
+            list: Per client, one dict per intervention with its Shapley value
+                and its uplift when applied alone
+        """
+        shapley = predictions @ self.shapley_weights.T
+        uplift = predictions[:, self.single_indices] - predictions[:, :1]
+        return [
+            [
+                {"name": name, "shapley": float(value), "uplift": float(alone)}
+                for name, value, alone in zip(COLUMN_INTERVENTIONS, client_shapley, client_uplift)
+            ]
+            for client_shapley, client_uplift in zip(shapley, uplift)
+        ]
+
+    def format_results(self, predictions, explain=False, top_indices=None):
+        """Convert a block of predictions into process_results output, one per client."""
+        if top_indices is None:
+            top_indices = [self.top_k_indices(row) for row in predictions]
+        results = []
+        for client_predictions, top in zip(predictions, top_indices):
+            top_results = np.column_stack((self.combinations[top], client_predictions[top]))
+            results.append(process_results(client_predictions[:1], top_results))
+        if explain:
+            for result, attributions in zip(results, self.attributions(predictions)):
+                result["attributions"] = attributions
+        return results
+
+    def score(self, model, raw_rows, explain=False):
+        """
+        Score a block of cleaned client rows.
+
+        Args:
+            model: Fitted regressor with a predict method
+            raw_rows (array-like): Cleaned client rows, shape (clients, features)
+            explain (bool): Whether to add per-intervention attributions
+
+        Returns:
+            list: Processed results with baseline and top interventions per client
+        """
+        raw_rows = np.asarray(raw_rows, dtype=float)
+        predictions = self.predict(model, raw_rows)
+        with STAGE_TIMER.time("select", model):
+            top_indices = [self.top_k_indices(row) for row in predictions]
+        with STAGE_TIMER.time("format", model):
+            return self.format_results(predictions, explain=explain, top_indices=top_indices)
+
+
+class AdditiveScorer(InterventionScorer):
+    """
+    Closed-form scorer for linear models.
+
+    For an additive model every combination's prediction is the baseline plus
+    the sum of its intervention coefficients, so the 128 uplifts come from one
+    small product of the combination block with the coefficients and no
+    feature matrix or model call is needed. Predictions match the matrix path
+    up to floating point rounding; rankings match because near-equal
+    predictions are ranked as ties in both paths (see rank_ascending).
+    """
+
+    @staticmethod
+    def supports(model):
+        """Return True if the model's predictions are additive in its inputs."""
+        return isinstance(unwrap_model(model), (LinearRegression, Ridge, Lasso, ElasticNet))
+
+    def predict(self, model, raw_rows):
+        """
+        Predict every combination for each client from the model coefficients.
+
+        Returns:
+            np.array: Predictions of shape (clients, combinations)
+        """
+        with STAGE_TIMER.time("predict", model):
+            model = unwrap_model(model)
+            coefficients = np.ravel(model.coef_)
+            num_features = raw_rows.shape[1]
+            baseline = raw_rows @ coefficients[:num_features] + model.intercept_
+            uplift = self.combinations @ coefficients[num_features:]
+            return baseline[:, np.newaxis] + uplift[np.newaxis, :]
+
+
+class BeamSearchScorer:
+    """
+    Bounded intervention search for when exhaustive enumeration is too large.
+
+    Starting from the empty combination, each level adds one more intervention
+    to every combination on the beam, scores all new candidates with a single
+    predict, and keeps the best beam_width of them. The search stops after the
+    last level or once the latency budget is spent (at least one level always
+    runs), and the top-k of everything evaluated is returned in the same shape
+    as the exhaustive scorers. Rankings are not guaranteed to be exact.
+    """
+
+    def __init__(self, num_interventions=len(COLUMN_INTERVENTIONS), top_k=3,
+                 beam_width=8, budget_seconds=0.05):
+        self.num_interventions = num_interventions
+        self.top_k = top_k
+        self.beam_width = beam_width
+        self.budget_seconds = budget_seconds
+        # Combination index in intervention_permutations order (first column most significant)
+        self._place_values = 2 ** np.arange(num_interventions - 1, -1, -1)
+
+    @staticmethod
+    def _predict(model, raw_row, combinations):
+        """Predict each combination of interventions for one client row."""
+        features = np.broadcast_to(raw_row, (len(combinations), len(raw_row)))
+        return model.predict(np.hstack((features, combinations)))
+
+    def _expand(self, frontier):
+        """Return every distinct combination with one intervention added to a frontier row."""
+        num_rows = len(frontier)
+        candidates = np.repeat(frontier, self.num_interventions, axis=0)
+        added = np.tile(np.arange(self.num_interventions), num_rows)
+        rows = np.arange(len(candidates))
+        is_new = candidates[rows, added] == 0
+        candidates[rows, added] = 1
+        return np.unique(candidates[is_new], axis=0)
+
+    def search(self, model, raw_row):
+        """
+        Run the beam search for one client.
+
+        Args:
+            model: Fitted regressor with a predict method
+            raw_row (np.array): Cleaned client row
+
+        Returns:
+            dict: Processed results with baseline and top interventions
+        """
+        deadline = time.perf_counter() + self.budget_seconds
+        frontier = np.zeros((1, self.num_interventions))
+        baseline = self._predict(model, raw_row, frontier)
+        evaluated = [frontier]
+        scores = [baseline]
+        for level in range(self.num_interventions):
+            if level > 0 and time.perf_counter() > deadline:
+                break
+            candidates = self._expand(frontier)
+            predictions = self._predict(model, raw_row, candidates)
+            evaluated.append(candidates)
+            scores.append(predictions)
+            if len(candidates) > self.beam_width:
+                keep = np.argpartition(predictions, -self.beam_width)[-self.beam_width:]
+                candidates = candidates[keep]
+            frontier = candidates
+
+        combinations = np.concatenate(evaluated)
+        predictions = np.concatenate(scores)
+        # Rank by prediction, breaking ties by combination index like the exhaustive scorers
+        order = rank_ascending(predictions, combinations @ self._place_values)[-self.top_k:]
+        top_results = np.column_stack((combinations[order], predictions[order]))
+        return process_results(baseline, top_results)
+
+    def score(self, model, raw_rows, explain=False):
+        """
+        Score a block of cleaned client rows.
+
+        Args:
+            model: Fitted regressor with a predict method
+            raw_rows (array-like): Cleaned client rows, shape (clients, features)
+            explain (bool): Not supported, attributions need every combination
+
+        Returns:
+            list: Processed results with baseline and top interventions per client
+        """
+        if explain:
+            raise ValueError(
+                "Intervention attributions need exhaustive scoring, "
+                f"which is limited to {settings.intervention_exhaustive_limit} interventions"
+            )
+        raw_rows = np.asarray(raw_rows, dtype=float)
+        with STAGE_TIMER.time("search", model):
+            return [self.search(model, raw_row) for raw_row in raw_rows]
+
+
+if len(COLUMN_INTERVENTIONS) <= settings.intervention_exhaustive_limit:
+    SCORER = InterventionScorer()
+    ADDITIVE_SCORER = AdditiveScorer()
+else:
+    SCORER = ADDITIVE_SCORER = None
+BEAM_SCORER = BeamSearchScorer(
+    beam_width=settings.intervention_beam_width,
+    budget_seconds=settings.intervention_search_budget_ms / 1000
+)
+
+def get_scorer(model):
+    """
+    Pick the cheapest scorer that gives exact rankings for a model.
+
+    Args:
+        model: Active model
+
+    Returns:
+        The beam search scorer when there are too many interventions to
+        enumerate, else the analytic scorer for linear models, else the
+        matrix scorer
+    """
+    if SCORER is None:
+        return BEAM_SCORER
+    return ADDITIVE_SCORER if AdditiveScorer.supports(model) else SCORER
+
+PREDICTION_CACHE = PredictionCache(
+    maxsize=settings.prediction_cache_size,
+    ttl=settings.prediction_cache_ttl_seconds
+)
+
+def model_identifier(model=None):
+    """
+    Identify a loaded model instance for use in cache keys.
+
+    Args:
+        model: Model instance, defaults to the active model
+
+    Returns:
+        str: Model type name and instance id
+    """
+    model = get_model() if model is None else model
+    return f"{model_type_name(model)}:{id(model)}"
+
+def set_model(new_model):
+    """
+    Make new_model the active model and invalidate cached predictions.
+
+    Args:
+        new_model: Fitted sklearn model
+    """
+    global _model  # pylint: disable=global-statement
+    with _model_lock:
+        _model = prepare_model(new_model)
+    PREDICTION_CACHE.clear()
+
+def warm_up(model=None):
+    """
+    Run one prediction so the first real request does not pay for lazy setup.
+
+    Args:
+        model: Model to warm, defaults to the active model (loading it if needed)
+    """
+    model = get_model() if model is None else model
+    raw_rows = np.zeros((1, model.n_features_in_ - len(COLUMN_INTERVENTIONS)))
+    get_scorer(model).score(model, raw_rows)
+
+def interpret_and_calculate(input_data, model=None, explain=False):
     """
     Main function to process input data and generate intervention recommendations.
 
     Args:
         input_data (dict): Raw input data from client
+        model: Model to score with, defaults to the active model
+        explain (bool): Whether to add per-intervention Shapley attributions
 
     Returns:
         dict: Processed results with recommendations
     """
-    raw_data = clean_input_data(input_data)
-    baseline_row = get_baseline_row(raw_data).reshape(1, -1)
-    intervention_rows = create_matrix(raw_data)
-    baseline_prediction = MODEL.predict(baseline_row)
-    intervention_predictions = MODEL.predict(intervention_rows).reshape(-1, 1)
-    result_matrix = np.concatenate((intervention_rows, intervention_predictions), axis=1)
-    result_order = result_matrix[:, -1].argsort()
-    result_matrix = result_matrix[result_order]
-    top_results = result_matrix[-3:, -8:]
-    return process_results(baseline_prediction, top_results)
+    model = get_model() if model is None else model
+    with STAGE_TIMER.time("encode", model):
+        raw_data = ENCODER.encode_record(input_data)
+    with STAGE_TIMER.time("cache", model):
+        cache_key = (model_identifier(model), tuple(raw_data.tolist()), explain)
+        result = PREDICTION_CACHE.get(cache_key)
+    if result is None:
+        result = get_scorer(model).score(model, raw_data[np.newaxis, :], explain=explain)[0]
+        PREDICTION_CACHE.put(cache_key, result)
+    return result
+
+def interpret_and_calculate_batch(input_batch, chunk_size=BATCH_CHUNK_SIZE, model=None,
+                                  use_cache=True, explain=False):
+    """
+    Process many clients at once, scoring each chunk with a single model call.
+
+    Args:
+        input_batch (list): Raw input dicts, one per client
+        chunk_size (int): Maximum number of clients per model call
+        model: Model to score with, defaults to the active model
+        use_cache (bool): Whether to read and fill the prediction cache; bulk
+            jobs turn it off so they do not evict interactive entries
+        explain (bool): Whether to add per-intervention Shapley attributions
+
+    Returns:
+        list: Processed results with recommendations, in input order
+    """
+    model = get_model() if model is None else model
+    with STAGE_TIMER.time("encode", model):
+        raw_rows = ENCODER.encode_batch(input_batch)
+    if use_cache:
+        identifier = model_identifier(model)
+        cache_keys = [(identifier, tuple(raw_data), explain) for raw_data in raw_rows.tolist()]
+        results = [PREDICTION_CACHE.get(key) for key in cache_keys]
+    else:
+        results = [None] * len(raw_rows)
+    missing = [index for index, result in enumerate(results) if result is None]
+    scorer = get_scorer(model)
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        scored = scorer.score(model, raw_rows[chunk], explain=explain)
+        for index, result in zip(chunk, scored):
+            results[index] = result
+            if use_cache:
+                PREDICTION_CACHE.put(cache_keys[index], result)
+    return results
+
+def what_if(input_data, feature_values, include_interventions=False, model=None):
+    """
+    Predict a client's outcome over a grid of modified feature values.
+
+    Every combination of the given feature values becomes one grid point; all
+    points (plus the unmodified client) are scored in a single vectorized call.
+
+    Args:
+        input_data (dict): Raw input data from client
+        feature_values (dict): Feature column name to the list of values to try
+        include_interventions (bool): Also rank intervention combinations per grid point
+        model: Model to score with, defaults to the active model
+
+    Returns:
+        dict: Grid axes, unmodified baseline, baseline surface and, if requested,
+            the processed results for every grid point
+
+    Raises:
+        ValueError: If a feature is unknown or the grid exceeds the configured caps
+    """
+    model = get_model() if model is None else model
+    unknown = [name for name in feature_values if name not in FEATURE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown features: {unknown}")
+    axes = [np.asarray(values, dtype=float) for values in feature_values.values()]
+    shape = tuple(len(axis) for axis in axes)
+    num_points = int(np.prod(shape))
+    if num_points > settings.what_if_max_grid_points:
+        raise ValueError(
+            f"Grid has {num_points} points, the maximum is {settings.what_if_max_grid_points}"
+        )
+
+    raw_data = ENCODER.encode_record(input_data)
+    grid_rows = np.repeat(raw_data[np.newaxis, :], num_points + 1, axis=0)
+    for name, mesh in zip(feature_values, np.meshgrid(*axes, indexing="ij")):
+        grid_rows[1:, FEATURE_COLUMNS.index(name)] = mesh.ravel()
+
+    result = {
+        "features": list(feature_values),
+        "values": [axis.tolist() for axis in axes]
+    }
+    if include_interventions:
+        scorer = get_scorer(model)
+        num_rows = (num_points + 1) * getattr(scorer, "num_combinations", 1)
+        if num_rows > settings.what_if_max_rows:
+            raise ValueError(
+                f"Grid needs {num_rows} model rows, the maximum is {settings.what_if_max_rows}"
+            )
+        scored = scorer.score(model, grid_rows)
+        baselines = np.array([float(item["baseline"]) for item in scored])
+        result["interventions"] = np.array(scored[1:], dtype=object).reshape(shape).tolist()
+    else:
+        intervention_columns = np.zeros((num_points + 1, len(COLUMN_INTERVENTIONS)))
+        baselines = model.predict(np.hstack((grid_rows, intervention_columns)))
+    result["baseline"] = float(baselines[0])
+    result["surface"] = baselines[1:].reshape(shape).tolist()
+    return result
 
 if __name__ == "__main__":
     test_data = {
@@ -0,0 +1,54 @@
+"""
+Prediction metrics module.
+Times each stage of the prediction pipeline into Prometheus histograms
+labeled by model, for export through the /metrics endpoint.
+"""
+
+# Standard library imports
+from contextlib import nullcontext
+
+# Third-party imports
+from prometheus_client import Histogram
+
+# Local imports
+from app.config import settings
+from app.clients.service.tree_engine import model_type_name
+
+PREDICTION_STAGE_SECONDS = Histogram(
+    "prediction_stage_seconds",
+    "Time spent in each stage of the prediction pipeline",
+    ["stage", "model"],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+             0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# Shared no-op context returned for every stage while timing is disabled
+_DISABLED = nullcontext()
+
+
+class StageTimer:
+    """
+    Factory of per-stage timing contexts.
+
+    When disabled, time returns one shared no-op context without looking at
+    its arguments, so instrumented code pays a single attribute check.
+    """
+
+    def __init__(self, histogram, enabled=True):
+        self.histogram = histogram
+        self.enabled = enabled
+
+    def time(self, stage, model):
+        """
+        Return a context manager that observes its duration for a stage.
+
+        Args:
+            stage (str): Pipeline stage, e.g. "encode" or "predict"
+            model: Model doing the work, labeled by its estimator type
+        """
+        if not self.enabled:
+            return _DISABLED
+        return self.histogram.labels(stage, model_type_name(model)).time()
+
+
+STAGE_TIMER = StageTimer(PREDICTION_STAGE_SECONDS, enabled=settings.prediction_metrics_enabled)
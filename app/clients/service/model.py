@@ -1,10 +1,19 @@
 """
 Model training module for the Common Assessment Tool.
 Handles the preparation, training, and saving of the prediction model.
+
+Usage:
+    python -m app.clients.service.model [--models random_forest gradient_boost] [--workers 3]
 """
 
 # Standard library imports
+import argparse
+import os
 import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 
 # Third-party imports
 import numpy as np
@@ -14,15 +23,78 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import GradientBoostingRegressor
 
+# Local imports
+from app.clients.service.model_store import export_artifact, file_digest
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(CURRENT_DIR, 'data_commontool.csv')
+TARGET_COLUMN = 'success_rate'
 
-def prepare_training_data():
+
+def load_dataset(data_path=DATA_PATH):
+    """
+    Load the training columns, reading the CSV only when its cached arrays are stale.
+
+    The parsed columns are cached next to the CSV in an uncompressed .npz file,
+    one array per column, tagged with the digest of the CSV it came from.
+
+    Args:
+        data_path (str): Path of the training CSV
+
+    Returns:
+        tuple: (features, targets) as NumPy arrays
+    """
+    cache_path = os.path.splitext(data_path)[0] + '.npz'
+    digest = file_digest(data_path)
+    columns = get_training_columns() + [TARGET_COLUMN]
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if str(cached['source_digest']) == digest and all(c in cached for c in columns):
+                return (np.column_stack([cached[c] for c in columns[:-1]]),
+                        cached[TARGET_COLUMN])
+    data = pd.read_csv(data_path, usecols=columns)
+    arrays = {column: data[column].to_numpy() for column in columns}
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.npz')
+    os.close(fd)
+    try:
+        np.savez(temp_path, source_digest=np.array(digest), **arrays)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return np.column_stack([arrays[c] for c in columns[:-1]]), arrays[TARGET_COLUMN]
+
+
+def split_dataset(features, targets):
+    """
+    Split the dataset into training and hold-out parts.
+
+    Returns:
+        tuple: (features_train, features_test, targets_train, targets_test)
+    """
+    return train_test_split(features, targets, test_size=0.2, random_state=42)
+
+
+def prepare_training_data(data_path=DATA_PATH):
     """
     Loads and prepares the dataset for training.
+    Args:
+        data_path (str): Path of the training CSV
     Returns:
         tuple: (features_train, targets_train)
     """
-     # Load dataset
-    data = pd.read_csv('data_commontool.csv')
+    features, targets = load_dataset(data_path)
+    features_train, _, targets_train, _ = split_dataset(features, targets)
+    return features_train, targets_train
+
+
+def get_training_columns():
+    """
+    Return the model input columns: client features, then interventions.
+    Returns:
+        list: Column names in the order the models are trained on
+    """
     # Define feature columns
     feature_columns = [
         'age',                    # Client's age
@@ -61,28 +133,21 @@ def prepare_training_data():
         'enhanced_referrals'
     ]
     # Combine all feature columns
-    all_features = feature_columns + intervention_columns
-    # Prepare training data
-    features = np.array(data[all_features])  # Changed from X to features
-    targets = np.array(data['success_rate'])  # Changed from y to targets
-    # Split the dataset
-    features_train, _, targets_train, _ = train_test_split(  # Removed unused variables
-        features,
-        targets,
-        test_size=0.2,
-        random_state=42
-    )
-    return features_train, targets_train
+    return feature_columns + intervention_columns
 
-def train_model_rf(features_train, targets_train):
+def train_model_rf(features_train, targets_train, n_jobs=None):
     """
     Train the Random Forest model using the dataset.
+    Args:
+        n_jobs (int): Cores to build trees on while training
     Returns:
         RandomForestRegressor: Trained model for predicting success rates
     """
     # Initialize and train the model
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
     model.fit(features_train, targets_train)
+    # The training core budget should not carry over to serving
+    model.n_jobs = None
     return model
 
 
@@ -111,13 +176,21 @@ def train_model_gb(features_train, targets_train):
 
 def save_model(model, filename="model.pkl"):
     """
-    Save the trained model to a file.
+    Save the trained model to a file, atomically replacing any existing one.
     Args:
         model: Trained model to save
         filename (str): Name of the file to save the model to
     """
-    with open(filename, "wb") as model_file:
-        pickle.dump(model, model_file)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)),
+                                     suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as model_file:
+            pickle.dump(model, model_file)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, filename)
+    except BaseException:
+        os.remove(temp_path)
+        raise
 
 
 def load_model(filename="model.pkl"):
@@ -132,18 +205,133 @@ def load_model(filename="model.pkl"):
         return pickle.load(model_file)
 
 
+# Model that model.pkl holds, served by default until another is activated
+DEFAULT_MODEL = "random_forest"
+
+# Trainer of each model and whether it can use more than one core
+TRAINERS = {
+    "random_forest": (train_model_rf, True),
+    "linear_regression": (train_model_lr, False),
+    "gradient_boost": (train_model_gb, False)
+}
+
+
+def core_budgets(model_names, cpus=None):
+    """
+    Split the machine's cores between models trained at the same time.
+
+    Single-threaded trainers get one core each and parallel trainers share
+    the rest, with at least one core each.
+
+    Returns:
+        dict: Model name to n_jobs budget, None for single-threaded trainers
+    """
+    cpus = cpus or os.cpu_count() or 1
+    parallel = [name for name in model_names if TRAINERS[name][1]]
+    spare = max(cpus - (len(model_names) - len(parallel)), len(parallel))
+    return {
+        name: max(spare // len(parallel), 1) if name in parallel else None
+        for name in model_names
+    }
+
+
+def _train_and_score(name, n_jobs, features_train, targets_train, features_test, targets_test):
+    """Train one model in a worker process and score it on the hold-out set."""
+    # pylint: disable=too-many-arguments
+    trainer, parallel = TRAINERS[name]
+    start = time.perf_counter()
+    if parallel:
+        model = trainer(features_train, targets_train, n_jobs=n_jobs)
+    else:
+        model = trainer(features_train, targets_train)
+    seconds = time.perf_counter() - start
+    return model, seconds, model.score(features_test, targets_test)
+
+
+def train_all(model_names=None, data_path=DATA_PATH, output_dir=CURRENT_DIR, workers=None,
+              default_model=DEFAULT_MODEL):
+    """
+    Train models concurrently in a process pool and save them.
+
+    Each model is written to a versioned file under <output_dir>/versions and
+    then atomically replaces <output_dir>/<name>.pkl; tree ensembles also get
+    a fresh memory-mappable artifact. When default_model is retrained it also
+    replaces <output_dir>/model.pkl, the model served until another is
+    activated, and that file's artifact.
+
+    Args:
+        model_names (list): Models to train, defaults to every model in TRAINERS
+        data_path (str): Path of the training CSV
+        output_dir (str): Directory the serving models are loaded from
+        workers (int): Processes to train in, defaults to one per model
+        default_model (str): Model served from model.pkl, None to leave model.pkl as is
+
+    Returns:
+        list: One dict per model with its training seconds, hold-out R^2 and paths
+    """
+    model_names = list(TRAINERS) if model_names is None else model_names
+    features_train, features_test, targets_train, targets_test = split_dataset(
+        *load_dataset(data_path)
+    )
+    budgets = core_budgets(model_names)
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    version_dir = os.path.join(output_dir, "versions")
+    os.makedirs(version_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers or len(model_names)) as pool:
+        futures = {
+            name: pool.submit(_train_and_score, name, budgets[name], features_train,
+                              targets_train, features_test, targets_test)
+            for name in model_names
+        }
+        summary = []
+        for name, future in futures.items():
+            model, seconds, score = future.result()
+            versioned_path = os.path.join(version_dir, f"{name}-{version}.pkl")
+            save_model(model, filename=versioned_path)
+            model_path = os.path.join(output_dir, f"{name}.pkl")
+            save_model(model, filename=model_path)
+            if isinstance(model, (RandomForestRegressor, GradientBoostingRegressor)):
+                export_artifact(model_path)
+            summary.append({
+                "model": name,
+                "n_jobs": budgets[name],
+                "train_seconds": seconds,
+                "holdout_r2": score,
+                "path": model_path,
+                "version_path": versioned_path
+            })
+            if name == default_model:
+                default_path = os.path.join(output_dir, "model.pkl")
+                save_model(model, filename=default_path)
+                if isinstance(model, (RandomForestRegressor, GradientBoostingRegressor)):
+                    export_artifact(default_path)
+                summary[-1]["default_path"] = default_path
+    return summary
+
+
 def main():
-    features_train, targets_train = prepare_training_data()
+    """Main function to train and save the models."""
+    parser = argparse.ArgumentParser(description="Train the prediction models")
+    parser.add_argument("--models", nargs="*", choices=list(TRAINERS),
+                        help="Models to train, defaults to all")
+    parser.add_argument("--data", default=DATA_PATH, help="Training CSV")
+    parser.add_argument("--output-dir", default=CURRENT_DIR,
+                        help="Directory the serving models are loaded from")
+    parser.add_argument("--workers", type=int, help="Training processes, defaults to one per model")
+    parser.add_argument("--default-model", default=DEFAULT_MODEL, choices=list(TRAINERS),
+                        help="Model written to model.pkl, the one served by default")
+    args = parser.parse_args()
 
-    """Main function to train and save the model."""
     print("Starting model training...")
-    model_rf = train_model_rf(features_train, targets_train)
-    model_lr = train_model_lr(features_train, targets_train)
-    model_gb = train_model_gb(features_train, targets_train)
-    save_model(model_rf, filename="random_forest.pkl")
-    save_model(model_lr, filename="linear_regression.pkl")
-    save_model(model_gb, filename="gradient_boost.pkl")
-    print("Model training completed and saved successfully.")
+    start = time.perf_counter()
+    summary = train_all(args.models, args.data, args.output_dir, args.workers, args.default_model)
+    for result in summary:
+        print(f"{result['model']:20s} {result['train_seconds']:7.2f} s  "
+              f"hold-out R^2 {result['holdout_r2']:.4f}  -> {result['version_path']}")
+        if "default_path" in result:
+            print(f"{'':20s} now served by default from {result['default_path']}")
+    print(f"Model training completed and saved successfully in "
+          f"{time.perf_counter() - start:.2f} s.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+"""
+Model artifact storage module.
+Exports tree ensembles as joblib files of flat NumPy node tables that can be
+memory-mapped, and loads models preferring those artifacts over pickles.
+"""
+
+# Standard library imports
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+# Third-party imports
+import joblib
+
+# Local imports
+from app.clients.service.tree_engine import CompiledTreeEnsemble
+
+ARTIFACT_EXTENSION = ".joblib"
+
+
+def artifact_path(pickle_path):
+    """Return the memory-mappable artifact path that belongs to a pickle."""
+    return os.path.splitext(pickle_path)[0] + ARTIFACT_EXTENSION
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    with open(path, "rb") as source_file:
+        return hashlib.sha256(source_file.read()).hexdigest()
+
+
+def export_artifact(pickle_path):
+    """
+    Write the memory-mappable artifact for a pickled tree ensemble.
+
+    The artifact records the digest of its source pickle so a retrained
+    pickle is never served from a stale artifact. It is written to a
+    temporary file and renamed into place atomically.
+
+    Args:
+        pickle_path (str): Path of the pickled sklearn model
+
+    Returns:
+        str: Path of the written artifact
+    """
+    with open(pickle_path, "rb") as model_file:
+        model = pickle.load(model_file)
+    state = CompiledTreeEnsemble(model).get_state()
+    state["source_digest"] = file_digest(pickle_path)
+    destination = artifact_path(pickle_path)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(destination), suffix=".tmp")
+    os.close(fd)
+    try:
+        # Uncompressed, so joblib stores the arrays aligned for memory mapping
+        joblib.dump(state, temp_path)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, destination)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return destination
+
+
+def load_model(pickle_path, compiled=True, mmap_mode="r"):
+    """
+    Load a model, memory-mapping its compiled artifact when one is current.
+
+    Args:
+        pickle_path (str): Path of the pickled sklearn model
+        compiled (bool): Whether a compiled artifact may be used
+        mmap_mode (str): joblib memory-map mode for the artifact arrays
+
+    Returns:
+        CompiledTreeEnsemble backed by the artifact, or the unpickled model
+    """
+    artifact = artifact_path(pickle_path)
+    if compiled and os.path.exists(artifact):
+        state = joblib.load(artifact, mmap_mode=mmap_mode)
+        if state.get("source_digest") == file_digest(pickle_path):
+            return CompiledTreeEnsemble.from_state(state)
+    with open(pickle_path, "rb") as model_file:
+        return pickle.load(model_file)
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        print(f"Exported {export_artifact(path)}")
@@ -0,0 +1,204 @@
+"""
+Pagination module for client listings and searches.
+Encodes opaque keyset cursors, pages client queries by id, and keeps a
+per-database count of clients that is adjusted as clients are inserted and
+deleted instead of counted per page.
+"""
+
+# Standard library imports
+import base64
+import binascii
+import json
+import threading
+import time
+
+# Third-party imports
+from fastapi import HTTPException, status
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+# Local imports
+from app.config import settings
+from app.models import Client
+
+
+def encode_cursor(last_id):
+    """Return the opaque cursor for the page that starts after client last_id."""
+    payload = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Return the client id encoded in a cursor from encode_cursor.
+
+    Raises:
+        HTTPException: 400 if the cursor was not produced by encode_cursor
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        ) from e
+    if not isinstance(last_id, int):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return last_id
+
+
+def keyset_page(query, limit=None, after_id=None):
+    """
+    Order a client query by id and start it after a cursor.
+
+    The primary key index finds the first row after the cursor directly, so
+    every page costs the same however deep it is. One extra row is fetched
+    to tell whether another page follows (see split_page).
+
+    Args:
+        query: Select of Client rows, each client at most once (filter related
+            rows with EXISTS, e.g. Client.cases.any, rather than a join)
+        limit (int): Page size, or None for every remaining row
+        after_id (str): Cursor from a previous page, or None to start at the beginning
+
+    Returns:
+        Select: The paged query
+    """
+    query = query.order_by(Client.id)
+    if after_id is not None:
+        query = query.where(Client.id > decode_cursor(after_id))
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
+def split_page(rows, limit):
+    """
+    Trim the extra row fetched by keyset_page.
+
+    Returns:
+        tuple: (clients on this page, cursor of the next page or None on the last page)
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].id)
+
+
+def database_key(url):
+    """Identify a database by its URL, ignoring the driver so sync and async engines match."""
+    return url.set(drivername=url.get_backend_name()).render_as_string(hide_password=False)
+
+
+class RowCountCache:
+    """
+    Thread-safe per-database row counts with time-to-live.
+
+    A count is loaded with one COUNT query, then adjusted by the ORM inserts
+    and deletes committed in this process. Changes made elsewhere (other
+    workers, bulk statements) are picked up when the count expires.
+    """
+
+    def __init__(self, ttl=60.0):
+        self.ttl = ttl
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached count for a database, or None if missing or expired."""
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is None:
+                return None
+            expires_at, count = entry
+            if expires_at < time.monotonic():
+                del self._counts[key]
+                return None
+            return count
+
+    def put(self, key, count):
+        """Store a freshly counted value."""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._counts[key] = (time.monotonic() + self.ttl, count)
+
+    def adjust(self, key, delta):
+        """Add delta to a cached count; uncached databases are counted on next use."""
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is not None:
+                expires_at, count = entry
+                self._counts[key] = (expires_at, max(count + delta, 0))
+
+    def invalidate(self, key):
+        """Forget the count of a database, e.g. after its table is recreated."""
+        with self._lock:
+            self._counts.pop(key, None)
+
+
+CLIENT_COUNT = RowCountCache(ttl=settings.client_count_ttl_seconds)
+
+
+async def client_total(db):
+    """
+    Return the number of clients, counting only when no fresh count is cached.
+
+    Args:
+        db (AsyncSession): Session on the database to count
+
+    Returns:
+        int: Number of clients
+    """
+    key = database_key(db.get_bind().url)
+    total = CLIENT_COUNT.get(key)
+    if total is None:
+        total = await db.scalar(select(func.count()).select_from(Client))
+        CLIENT_COUNT.put(key, total)
+    return total
+
+
+def client_total_sync(db):
+    """Synchronous client_total for Session users such as ClientService."""
+    key = database_key(db.get_bind().url)
+    total = CLIENT_COUNT.get(key)
+    if total is None:
+        total = db.scalar(select(func.count()).select_from(Client))
+        CLIENT_COUNT.put(key, total)
+    return total
+
+
+# The ORM events below fire for sync sessions and for the sync session
+# underneath every AsyncSession
+
+@event.listens_for(Session, "after_flush")
+def _track_client_changes(session, flush_context):
+    # pylint: disable=unused-argument
+    # new and deleted still hold the pre-flush state here
+    delta = sum(isinstance(obj, Client) for obj in session.new)
+    delta -= sum(isinstance(obj, Client) for obj in session.deleted)
+    if delta:
+        session.info["client_count_delta"] = session.info.get("client_count_delta", 0) + delta
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_client_changes(session):
+    delta = session.info.pop("client_count_delta", 0)
+    if delta:
+        CLIENT_COUNT.adjust(database_key(session.get_bind(Client).url), delta)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_client_changes(session):
+    session.info.pop("client_count_delta", None)
+
+
+@event.listens_for(Client.__table__, "after_create")
+@event.listens_for(Client.__table__, "after_drop")
+def _reset_client_count(target, connection, **kw):
+    # pylint: disable=unused-argument
+    CLIENT_COUNT.invalidate(database_key(connection.engine.url))
@@ -0,0 +1,216 @@
+"""
+Prediction service module handling the materialized predictions of stored clients.
+Scores clients in batches and persists the baseline and top interventions per model.
+"""
+
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import database
+from app.models import Client, ClientPrediction
+from app.clients.service.client_service import AsyncClientService, ClientService
+from app.clients.service.encoder import FEATURE_COLUMNS
+from app.clients.service.executor import PREDICTION_EXECUTOR
+from app.clients.service.logic import interpret_and_calculate_batch
+from app.clients.service.registry import MODEL_REGISTRY
+
+logger = logging.getLogger("uvicorn")
+
+# Clients scored and written per batch when refreshing
+REFRESH_BATCH_SIZE = 256
+
+
+class PredictionService:
+    @staticmethod
+    def client_input(client: Client):
+        """Build the raw prediction input for a stored client"""
+        return {column: getattr(client, column) for column in FEATURE_COLUMNS}
+
+    @staticmethod
+    def score_inputs(inputs: List[dict], model_name: str):
+        """Score raw client inputs with a registered model, bypassing the request cache"""
+        return interpret_and_calculate_batch(
+            inputs,
+            model=MODEL_REGISTRY.get(model_name),
+            use_cache=False
+        )
+
+    @staticmethod
+    def prediction_rows(client_ids: List[int], results: List[dict], model_name: str):
+        """Build unsaved prediction rows from scored results"""
+        updated_at = datetime.utcnow()
+        return [
+            ClientPrediction(
+                client_id=client_id,
+                model_name=model_name,
+                baseline=float(result["baseline"]),
+                interventions=[[float(value), names] for value, names in result["interventions"]],
+                updated_at=updated_at
+            )
+            for client_id, result in zip(client_ids, results)
+        ]
+
+    @staticmethod
+    def compute_predictions(db: Session, clients: List[Client], model_name: str):
+        """Score clients with a registered model and upsert their prediction rows"""
+        results = PredictionService.score_inputs(
+            [PredictionService.client_input(client) for client in clients], model_name
+        )
+        rows = [
+            db.merge(row) for row in PredictionService.prediction_rows(
+                [client.id for client in clients], results, model_name
+            )
+        ]
+        db.commit()
+        return rows
+
+    @staticmethod
+    def get_client_predictions(db: Session, client_id: int, model_name: Optional[str] = None):
+        """
+        Get the stored prediction for a client under a model (the active one by default).
+        Missing rows, e.g. right after an update, are computed and stored on demand.
+        """
+        model_name = model_name or MODEL_REGISTRY.current_name()
+        prediction = db.get(ClientPrediction, (client_id, model_name))
+        if prediction is None:
+            client = ClientService.get_client(db, client_id)
+            prediction = PredictionService.compute_predictions(db, [client], model_name)[0]
+        return prediction
+
+    @staticmethod
+    def refresh_clients(db: Session, client_ids: List[int], model_name: Optional[str] = None):
+        """Recompute stored predictions for the given clients"""
+        model_name = model_name or MODEL_REGISTRY.current_name()
+        for start in range(0, len(client_ids), REFRESH_BATCH_SIZE):
+            batch_ids = client_ids[start:start + REFRESH_BATCH_SIZE]
+            clients = db.query(Client).filter(Client.id.in_(batch_ids)).all()
+            if clients:
+                PredictionService.compute_predictions(db, clients, model_name)
+
+    @staticmethod
+    def refresh_all(db: Session, model_name: Optional[str] = None):
+        """Recompute stored predictions for every client, in id-ordered batches"""
+        model_name = model_name or MODEL_REGISTRY.current_name()
+        last_id = 0
+        while True:
+            clients = db.query(Client).filter(Client.id > last_id).order_by(Client.id).limit(
+                REFRESH_BATCH_SIZE
+            ).all()
+            if not clients:
+                return
+            PredictionService.compute_predictions(db, clients, model_name)
+            last_id = clients[-1].id
+
+    @staticmethod
+    def refresh_in_background(
+        db: Session,
+        client_ids: Optional[List[int]] = None,
+        model_name: Optional[str] = None
+    ):
+        """
+        Background task entry point: refresh the given clients, or all clients if None,
+        using a fresh session on the same engine as the request session.
+        """
+        try:
+            with Session(bind=db.get_bind()) as session:
+                if client_ids is None:
+                    PredictionService.refresh_all(session, model_name)
+                else:
+                    PredictionService.refresh_clients(session, client_ids, model_name)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Failed to refresh stored client predictions")
+
+
+class AsyncPredictionService:
+    """
+    Async counterparts of the PredictionService operations for request handlers.
+    Scoring runs in the bounded prediction worker pool, so neither queries nor
+    the model block the event loop, and refreshes share its queue limit.
+    """
+
+    @staticmethod
+    async def compute_predictions(db: AsyncSession, clients: List[Client], model_name: str):
+        """
+        Score clients with a registered model and upsert their prediction rows.
+
+        Raises:
+            HTTPException: 503 when the prediction queue is full, 504 on timeout
+        """
+        client_ids = [client.id for client in clients]
+        inputs = [PredictionService.client_input(client) for client in clients]
+        results = await PREDICTION_EXECUTOR.run(PredictionService.score_inputs, inputs, model_name)
+        rows = [
+            await db.merge(row)
+            for row in PredictionService.prediction_rows(client_ids, results, model_name)
+        ]
+        await db.commit()
+        return rows
+
+    @staticmethod
+    async def get_client_predictions(
+        db: AsyncSession, client_id: int, model_name: Optional[str] = None
+    ):
+        """
+        Get the stored prediction for a client under a model (the active one by default).
+        Missing rows, e.g. right after an update, are computed and stored on demand.
+        """
+        model_name = model_name or MODEL_REGISTRY.current_name()
+        prediction = await db.get(ClientPrediction, (client_id, model_name))
+        if prediction is None:
+            client = await AsyncClientService.get_client(db, client_id)
+            rows = await AsyncPredictionService.compute_predictions(db, [client], model_name)
+            prediction = rows[0]
+        return prediction
+
+    @staticmethod
+    async def refresh_clients(
+        db: AsyncSession, client_ids: List[int], model_name: Optional[str] = None
+    ):
+        """Recompute stored predictions for the given clients"""
+        model_name = model_name or MODEL_REGISTRY.current_name()
+        for start in range(0, len(client_ids), REFRESH_BATCH_SIZE):
+            batch_ids = client_ids[start:start + REFRESH_BATCH_SIZE]
+            clients = (await db.scalars(select(Client).where(Client.id.in_(batch_ids)))).all()
+            if clients:
+                await AsyncPredictionService.compute_predictions(db, clients, model_name)
+
+    @staticmethod
+    async def refresh_all(db: AsyncSession, model_name: Optional[str] = None):
+        """Recompute stored predictions for every client, in id-ordered batches"""
+        model_name = model_name or MODEL_REGISTRY.current_name()
+        last_id = 0
+        while True:
+            clients = (await db.scalars(
+                select(Client).where(Client.id > last_id).order_by(Client.id).limit(
+                    REFRESH_BATCH_SIZE
+                )
+            )).all()
+            if not clients:
+                return
+            await AsyncPredictionService.compute_predictions(db, clients, model_name)
+            last_id = clients[-1].id
+
+    @staticmethod
+    async def refresh_in_background(
+        client_ids: Optional[List[int]] = None,
+        model_name: Optional[str] = None
+    ):
+        """
+        Background task entry point: refresh the given clients, or all clients if None.
+
+        The task opens its own session from database.AsyncSessionLocal rather
+        than reusing the request's, which may be closed by the time it runs.
+        """
+        try:
+            async with database.AsyncSessionLocal() as session:
+                if client_ids is None:
+                    await AsyncPredictionService.refresh_all(session, model_name)
+                else:
+                    await AsyncPredictionService.refresh_clients(session, client_ids, model_name)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Failed to refresh stored client predictions")
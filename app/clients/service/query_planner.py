@@ -0,0 +1,113 @@
+"""
+Query planning module for client searches.
+Orders search predicates by estimated selectivity, renders EXPLAIN plans for
+a search, and counts which filters captured traffic actually uses.
+"""
+
+# Standard library imports
+import json
+import sys
+from collections import Counter
+from urllib.parse import parse_qsl
+
+# Third-party imports
+from sqlalchemy import text
+
+# Estimated fraction of clients matching each filter, from the column domains
+# (e.g. 14 schooling levels, 0-10 scales, booleans); age is a >= range filter
+CRITERIA_SELECTIVITY = {
+    "level_of_schooling": 1 / 14,
+    "reading_english_scale": 1 / 11,
+    "speaking_english_scale": 1 / 11,
+    "writing_english_scale": 1 / 11,
+    "numeracy_scale": 1 / 11,
+    "computer_scale": 1 / 11,
+    "income_source": 1 / 11,
+    "housing": 1 / 10,
+    "work_experience": 1 / 10,
+    "canada_workex": 1 / 10,
+    "time_unemployed": 1 / 10,
+    "dep_num": 1 / 5,
+    "age": 1 / 2,
+    "gender": 1 / 2,
+}
+# Boolean and unknown filters
+DEFAULT_SELECTIVITY = 1 / 2
+
+# Search endpoint whose query strings are counted by filter_frequency
+SEARCH_PATH = "/clients/search/by-criteria"
+
+
+def order_by_selectivity(conditions):
+    """
+    Order (column name, condition) pairs so the most selective condition comes first.
+
+    Databases that evaluate predicates left to right then reject most rows on
+    the first comparison; the sort is stable, so ties keep their order.
+
+    Returns:
+        list: The conditions, most selective first
+    """
+    ordered = sorted(
+        conditions,
+        key=lambda item: CRITERIA_SELECTIVITY.get(item[0], DEFAULT_SELECTIVITY)
+    )
+    return [condition for _, condition in ordered]
+
+
+def explain_prefix(dialect_name):
+    """Return the EXPLAIN statement prefix for a database dialect."""
+    return "EXPLAIN QUERY PLAN" if dialect_name == "sqlite" else "EXPLAIN"
+
+
+def render_sql(query, dialect):
+    """Render a select with its parameters inlined, for display and EXPLAIN."""
+    return str(query.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+def explain_statement(query, dialect):
+    """
+    Build the EXPLAIN statement for a select.
+
+    Args:
+        query: SQLAlchemy select to explain
+        dialect: Dialect of the database that will run it
+
+    Returns:
+        tuple: (rendered SQL of the query, EXPLAIN statement)
+    """
+    sql = render_sql(query, dialect)
+    return sql, text(f"{explain_prefix(dialect.name)} {sql}")
+
+
+def plan_lines(rows, dialect_name):
+    """Return one line per plan step; SQLite puts the step in its last column."""
+    if dialect_name == "sqlite":
+        return [str(row[-1]) for row in rows]
+    return [" ".join(str(value) for value in row) for row in rows]
+
+
+def filter_frequency(capture_path):
+    """
+    Count how often each filter is used by captured search requests.
+
+    Args:
+        capture_path (str): JSONL file written by traffic capture
+
+    Returns:
+        Counter: Query parameter name to number of searches using it
+    """
+    counts = Counter()
+    with open(capture_path, encoding="utf-8") as capture_file:
+        for line in capture_file:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("path") == SEARCH_PATH:
+                counts.update({name for name, _ in parse_qsl(entry.get("query", ""))})
+    return counts
+
+
+if __name__ == "__main__":
+    for name, count in filter_frequency(sys.argv[1]).most_common():
+        print(f"{name:35s} {count}")
@@ -0,0 +1,125 @@
+"""
+Model registry module.
+Keeps every available model loaded and warmed in memory so that requests can
+pick a model per call and the active model can be swapped atomically.
+"""
+
+# Standard library imports
+import logging
+import os
+import threading
+
+# Local imports
+from app.config import settings
+from app.clients.service import logic
+from app.clients.service.shadow import ShadowScorer
+from app.clients.service.tree_engine import model_type_name
+
+logger = logging.getLogger("uvicorn")
+
+# Registered model names and the sklearn type each file is expected to hold
+AVAILABLE_MODELS = {
+    "random_forest": "RandomForestRegressor",
+    "linear_regression": "LinearRegression",
+    "gradient_boost": "GradientBoostingRegressor"
+}
+
+
+class ModelRegistry:
+    """
+    In-memory registry of named models.
+
+    Each model is loaded from <model_dir>/<name>.pkl (or its memory-mapped
+    artifact) at most once and warmed with a dummy prediction before it is
+    handed out. Activating a model only swaps a reference, so in-flight
+    predictions finish on the model they started with.
+    """
+
+    def __init__(self, model_dir, models=None):
+        self.model_dir = model_dir
+        self.models = dict(AVAILABLE_MODELS if models is None else models)
+        self._loaded = {}
+        self._lock = threading.Lock()
+        # Held while the active model and its name change together
+        self._swap_lock = threading.Lock()
+        self.active_name = None
+
+    def names(self):
+        """Return the registered model names."""
+        return list(self.models)
+
+    def model_path(self, name):
+        """Return the pickle path of a registered model."""
+        return os.path.join(self.model_dir, f"{name}.pkl")
+
+    def get(self, name):
+        """
+        Return a loaded, warmed model by name.
+
+        Raises:
+            KeyError: If the name is not registered
+            FileNotFoundError: If the model file is missing
+        """
+        if name not in self.models:
+            raise KeyError(name)
+        model = self._loaded.get(name)
+        if model is None:
+            with self._lock:
+                model = self._loaded.get(name)
+                if model is None:
+                    logger.info(f"Loading model '{name}' from {self.model_path(name)}")
+                    model = logic.load_model_file(self.model_path(name))
+                    logic.warm_up(model)
+                    self._loaded[name] = model
+        return model
+
+    def preload(self):
+        """Load and warm every registered model."""
+        for name in self.models:
+            self.get(name)
+
+    def activate(self, name):
+        """
+        Make a registered model the default for predictions.
+
+        Returns:
+            The newly active model
+        """
+        model = self.get(name)
+        with self._swap_lock:
+            logic.set_model(model)
+            self.active_name = name
+        logger.info(f"Active model is now '{name}' ({model_type_name(model)})")
+        return model
+
+    def set_active_name(self, name):
+        """
+        Name the already loaded active model, e.g. when it has the requested type.
+
+        Returns:
+            bool: True if the active name changed
+        """
+        with self._swap_lock:
+            previous = self.current_name()
+            self.active_name = name
+        return previous != name
+
+    def current_name(self):
+        """Return the active model's registered name, inferred from its type if never set."""
+        if self.active_name is not None:
+            return self.active_name
+        model_type = model_type_name(logic.get_model())
+        return next(
+            (name for name, registered_type in self.models.items()
+             if registered_type == model_type),
+            model_type.lower()
+        )
+
+
+MODEL_REGISTRY = ModelRegistry(logic.CURRENT_DIR)
+
+SHADOW_SCORER = ShadowScorer(
+    MODEL_REGISTRY,
+    model_name=settings.shadow_model,
+    queue_size=settings.shadow_queue_size
+)
@@ -0,0 +1,135 @@
+"""
+Shadow scoring module.
+Scores live prediction traffic with a candidate model in the background and
+aggregates how closely it agrees with the model that served the response.
+"""
+
+# Standard library imports
+import logging
+import queue
+import threading
+
+# Local imports
+from app.clients.service import logic
+from app.clients.service.encoder import ENCODER
+
+logger = logging.getLogger("uvicorn")
+
+
+class ShadowScorer:
+    """
+    Background comparison of a candidate model against served predictions.
+
+    submit never blocks: work goes onto a bounded queue drained by a single
+    daemon thread, and is dropped (and counted) when the queue is full so
+    shadow scoring can never add latency or memory pressure under load.
+    """
+
+    def __init__(self, registry, model_name=None, queue_size=256):
+        self.registry = registry
+        self.model_name = model_name
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.reset()
+
+    def reset(self):
+        """Clear the agreement statistics."""
+        with self._lock:
+            self.compared = 0
+            self.dropped = 0
+            self.errors = 0
+            self.top1_matches = 0
+            self.overlap_total = 0.0
+            self.baseline_delta_total = 0.0
+            self.abs_baseline_delta_total = 0.0
+
+    def set_model(self, model_name):
+        """Shadow a different registered model (None disables shadowing) and reset stats."""
+        self.model_name = model_name
+        self.reset()
+
+    def _ensure_worker(self):
+        """Start the background thread on first use."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._work, name="shadow-scorer", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, input_batch, primary_results):
+        """
+        Queue served predictions for shadow scoring, dropping them if the queue is full.
+
+        Args:
+            input_batch (list): Raw input dicts that were scored
+            primary_results (list): Results returned to the caller, in the same order
+        """
+        model_name = self.model_name
+        if model_name is None:
+            return
+        try:
+            self._queue.put_nowait((model_name, input_batch, primary_results))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        self._ensure_worker()
+
+    def join(self):
+        """Block until every queued item has been compared."""
+        self._queue.join()
+
+    def _work(self):
+        """Drain the queue forever, comparing each item."""
+        while True:
+            model_name, input_batch, primary_results = self._queue.get()
+            try:
+                self.compare(model_name, input_batch, primary_results)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Shadow scoring failed")
+                with self._lock:
+                    self.errors += 1
+            finally:
+                self._queue.task_done()
+
+    def compare(self, model_name, input_batch, primary_results):
+        """Score inputs with the shadow model and accumulate agreement statistics."""
+        if model_name != self.model_name:
+            return
+        model = self.registry.get(model_name)
+        raw_rows = ENCODER.encode_batch(input_batch)
+        shadow_results = logic.get_scorer(model).score(model, raw_rows)
+        for primary, shadow in zip(primary_results, shadow_results):
+            primary_top = [frozenset(names) for _, names in primary["interventions"]]
+            shadow_top = [frozenset(names) for _, names in shadow["interventions"]]
+            overlap = len(set(primary_top) & set(shadow_top)) / len(primary_top)
+            delta = float(shadow["baseline"]) - float(primary["baseline"])
+            with self._lock:
+                self.compared += 1
+                self.top1_matches += primary_top[-1] == shadow_top[-1]
+                self.overlap_total += overlap
+                self.baseline_delta_total += delta
+                self.abs_baseline_delta_total += abs(delta)
+
+    def stats(self):
+        """
+        Return aggregated agreement statistics.
+
+        Returns:
+            dict: Shadow model, queue state and mean agreement measures
+        """
+        with self._lock:
+            compared = self.compared or 1
+            return {
+                "model": self.model_name,
+                "compared": self.compared,
+                "queued": self._queue.qsize(),
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "top1_agreement": self.top1_matches / compared,
+                "mean_top3_overlap": self.overlap_total / compared,
+                "mean_baseline_delta": self.baseline_delta_total / compared,
+                "mean_abs_baseline_delta": self.abs_baseline_delta_total / compared
+            }
@@ -4,19 +4,170 @@ Handles database connection and session management using SQLAlchemy.
 """
 # pylint: disable=invalid-name
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import settings
 
 # Here is where the database is located
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
+SQLALCHEMY_DATABASE_URL = settings.database_url
+
+# Async drivers used for each database backend
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+# Pragmas reported for SQLite databases
+SQLITE_PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size")
+
+
+def _is_in_memory_sqlite(url):
+    """Return True for SQLite URLs without a database file."""
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _tune_sqlite(engine, config):
+    """Apply the SQLite pragmas from config to every new connection of engine."""
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # pylint: disable=unused-argument
+        cursor = dbapi_connection.cursor()
+        if not _is_in_memory_sqlite(engine.url):
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(config.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(config.sqlite_mmap_size_bytes)}")
+        # Negative values are in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{int(config.sqlite_cache_size_kib)}")
+        cursor.close()
+
+
+def _engine_options(url, config):
+    """Return the create_engine keyword arguments for a database URL."""
+    options = {}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": config.sqlite_busy_timeout_ms / 1000
+        }
+    if not _is_in_memory_sqlite(url):
+        options.update(
+            pool_size=config.database_pool_size,
+            max_overflow=config.database_max_overflow,
+            pool_timeout=config.database_pool_timeout_seconds,
+            pool_recycle=config.database_pool_recycle_seconds,
+            pool_pre_ping=config.database_pool_pre_ping
+        )
+    return options
+
+
+def create_database_engine(database_url=None, config=settings):
+    """
+    Create the SQLAlchemy engine described by the settings.
+
+    SQLite connections may be shared between threads and, when tuning is
+    enabled, use WAL journaling so readers do not block on the writer. Other
+    databases (PostgreSQL through psycopg2) get a bounded connection pool
+    that recycles and pre-pings connections.
+
+    Args:
+        database_url (str): Database URL, defaults to config.database_url
+        config (Settings): Settings to read pool and SQLite options from
+
+    Returns:
+        Engine: Configured engine
+    """
+    url = make_url(database_url or config.database_url)
+    new_engine = create_engine(url, **_engine_options(url, config))
+    if url.get_backend_name() == "sqlite" and config.sqlite_tuned:
+        _tune_sqlite(new_engine, config)
+    return new_engine
+
+
+def async_database_url(database_url):
+    """
+    Return the URL with its backend's async driver, e.g. sqlite -> sqlite+aiosqlite.
+
+    URLs that already name a driver are returned unchanged.
+    """
+    url = make_url(database_url)
+    if url.drivername in ASYNC_DRIVERS:
+        return url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    return url
+
+
+def create_async_database_engine(database_url=None, config=settings):
+    """
+    Create the async engine for the same database as create_database_engine.
+
+    SQLite is reached through aiosqlite and PostgreSQL through asyncpg, with
+    the same pool and SQLite settings as the sync engine.
+
+    Args:
+        database_url (str): Database URL, defaults to config.database_url
+        config (Settings): Settings to read pool and SQLite options from
+
+    Returns:
+        AsyncEngine: Configured async engine
+    """
+    url = async_database_url(database_url or config.database_url)
+    options = _engine_options(url, config)
+    if url.get_backend_name() != "sqlite":
+        options.pop("connect_args", None)
+    elif "pool_size" in options:
+        # aiosqlite defaults to opening a connection per checkout
+        options["poolclass"] = AsyncAdaptedQueuePool
+    new_engine = create_async_engine(url, **options)
+    if url.get_backend_name() == "sqlite" and config.sqlite_tuned:
+        _tune_sqlite(new_engine.sync_engine, config)
+    return new_engine
+
+
+def database_report(db_engine):
+    """
+    Describe the active database settings, reading SQLite pragmas from a live connection.
+
+    Args:
+        db_engine (Engine): Engine to describe
+
+    Returns:
+        dict: URL without password, dialect, driver, pool settings and, for
+            SQLite, the effective pragma values
+    """
+    pool = db_engine.pool
+    report = {
+        "url": db_engine.url.render_as_string(hide_password=True),
+        "dialect": db_engine.dialect.name,
+        "driver": db_engine.driver,
+        "pool": type(pool).__name__
+    }
+    if hasattr(pool, "size"):
+        report.update(
+            pool_size=pool.size(),
+            max_overflow=getattr(pool, "_max_overflow", None),
+            pool_timeout=getattr(pool, "_timeout", None),
+            pool_recycle=getattr(pool, "_recycle", None),
+            pool_pre_ping=getattr(pool, "_pre_ping", None)
+        )
+    if db_engine.dialect.name == "sqlite":
+        with db_engine.connect() as connection:
+            for pragma in SQLITE_PRAGMAS:
+                report[pragma] = connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+    return report
+
 
 # Open up a connection so that we are able to use the database
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_database_engine(SQLALCHEMY_DATABASE_URL)
 
 # Bind the engine just created
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and sessions for request handlers; the sync ones stay for scripts
+async_engine = create_async_database_engine(SQLALCHEMY_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 #Create an object of our database so as to control the database
 Base = declarative_base()
 
@@ -31,3 +182,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Creates an async database session and ensures it's closed after use.
+    Yields:
+        AsyncSession: SQLAlchemy async database session
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
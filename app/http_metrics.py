@@ -0,0 +1,161 @@
+"""
+HTTP metrics module.
+Records per-route latency, in-flight requests, response sizes, status codes
+and time spent in SQLAlchemy as Prometheus metrics, and optionally logs one
+structured line per request.
+"""
+
+# Standard library imports
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+# Third-party imports
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Local imports
+from app.traffic import route_template
+
+logger = logging.getLogger("uvicorn")
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route and status code",
+    ["method", "route", "status"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce a full HTTP response",
+    ["method", "route"]
+)
+HTTP_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL statements while handling a request",
+    ["method", "route"]
+)
+HTTP_HANDLER_SECONDS = Histogram(
+    "http_request_handler_seconds",
+    "Time spent outside SQL statements while handling a request",
+    ["method", "route"]
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "http_response_size_bytes",
+    "Size of HTTP response bodies",
+    ["method", "route"],
+    buckets=(100, 1000, 10000, 100000, 1000000, 10000000)
+)
+# The route is only known once routing has run, so in-flight is per method
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method"]
+)
+
+
+class DatabaseTime:
+    """SQL statement count and time accumulated for one request."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.queries = 0
+        # Set once the response is sent; later statements belong to background tasks
+        self.closed = False
+
+
+# Accumulator of the request being handled; worker threads started from the
+# request copy the context and so add to the same accumulator
+_CURRENT_DB_TIME = ContextVar("current_db_time", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    # pylint: disable=unused-argument,too-many-arguments
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    # pylint: disable=unused-argument,too-many-arguments
+    elapsed = time.perf_counter() - conn.info["query_start_times"].pop()
+    db_time = _CURRENT_DB_TIME.get()
+    if db_time is not None and not db_time.closed:
+        db_time.seconds += elapsed
+        db_time.queries += 1
+
+
+class HTTPMetricsMiddleware:
+    """
+    ASGI middleware that records Prometheus metrics for every HTTP request.
+
+    Latency is split into time spent executing SQL statements (measured with
+    SQLAlchemy cursor events on every engine) and everything else, which is
+    attributed to the handler.
+    """
+
+    def __init__(self, app, log_requests=False):
+        self.app = app
+        self.log_requests = log_requests
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        response = {"status": 500, "bytes": 0}
+        db_time = DatabaseTime()
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        start = time.perf_counter()
+
+        def finish():
+            """Record the request once, when its response is complete or it failed"""
+            if db_time.closed:
+                return
+            db_time.closed = True
+            duration = time.perf_counter() - start
+            in_flight.dec()
+            # Unmatched paths share one label so 404 probes cannot blow up cardinality
+            route = route_template(scope) if "endpoint" in scope else "unmatched"
+            self._observe(method, route, response, duration, db_time)
+
+        async def send_and_measure(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+            # Background tasks run after the last body message, inside self.app;
+            # they are not part of the request's latency
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        token = _CURRENT_DB_TIME.set(db_time)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            _CURRENT_DB_TIME.reset(token)
+            finish()
+
+    def _observe(self, method, route, response, duration, db_time):
+        """Record the metrics, and the log line if enabled, for one finished request."""
+        handler_seconds = max(duration - db_time.seconds, 0.0)
+        HTTP_REQUESTS.labels(method, route, str(response["status"])).inc()
+        HTTP_REQUEST_SECONDS.labels(method, route).observe(duration)
+        HTTP_DB_SECONDS.labels(method, route).observe(db_time.seconds)
+        HTTP_HANDLER_SECONDS.labels(method, route).observe(handler_seconds)
+        HTTP_RESPONSE_BYTES.labels(method, route).observe(response["bytes"])
+        if self.log_requests:
+            logger.info(json.dumps({
+                "method": method,
+                "route": route,
+                "status": response["status"],
+                "duration_ms": round(duration * 1000, 3),
+                "db_ms": round(db_time.seconds * 1000, 3),
+                "db_queries": db_time.queries,
+                "handler_ms": round(handler_seconds * 1000, 3),
+                "response_bytes": response["bytes"]
+            }))
@@ -6,13 +6,24 @@ Handles database initialization and CORS middleware configuration.
 
 # pylint: disable=invalid-name
 
-from fastapi import FastAPI
+import logging
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from app import models
-from app.database import engine
+from app.database import async_engine, database_report, engine
 from app.clients.router import router as clients_router
 from app.auth.router import router as auth_router
+from app.clients.service.executor import PREDICTION_EXECUTOR
+from app.clients.service.registry import MODEL_REGISTRY
+from app.clients.service import logic
+from app.config import settings
+from app.http_metrics import HTTPMetricsMiddleware
+from app.traffic import SAFE_FIELDS, TRAFFIC_RECORDER, TrafficCaptureMiddleware
+
+logger = logging.getLogger("uvicorn")
 
 
 # Initialize database tables
@@ -25,10 +36,52 @@ app = FastAPI(
     version="1.0.0"
     )
 
+@app.on_event("startup")
+def warm_up_model():
+    """Load and warm every prediction model at startup instead of on first use, if enabled."""
+    if settings.model_warmup:
+        logic.warm_up()
+        MODEL_REGISTRY.preload()
+
+@app.on_event("startup")
+def report_database_settings():
+    """Log the database engine, pool and SQLite settings in effect."""
+    report = database_report(engine)
+    report["async_driver"] = async_engine.driver
+    logger.info("Database settings: %s",
+                ", ".join(f"{key}={value}" for key, value in report.items()))
+
+@app.on_event("shutdown")
+def shutdown_prediction_workers():
+    """Stop the prediction worker pool when the server stops."""
+    PREDICTION_EXECUTOR.shutdown()
+
+@app.on_event("shutdown")
+async def close_database_connections():
+    """Close pooled async database connections when the server stops."""
+    await async_engine.dispose()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Expose Prometheus metrics, including per-stage prediction timings."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(clients_router)
 
+# Sample live requests for replay, if enabled
+if settings.traffic_capture_enabled:
+    app.add_middleware(
+        TrafficCaptureMiddleware,
+        recorder=TRAFFIC_RECORDER,
+        safe_fields=SAFE_FIELDS | set(settings.traffic_capture_safe_fields)
+    )
+
+# Record per-route latency, status and database time, if enabled
+if settings.http_metrics_enabled:
+    app.add_middleware(HTTPMetricsMiddleware, log_requests=settings.http_request_log_enabled)
+
 # Configure CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -12,9 +12,13 @@ from sqlalchemy import (
     Integer,
     String,
     Boolean,
+    Float,
+    DateTime,
+    JSON,
     ForeignKey,
     CheckConstraint,
-    Enum
+    Enum,
+    Index
 )
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -87,6 +91,16 @@ class Client(Base):
     need_mental_health_support_bool = Column(Boolean)
     cases = relationship("ClientCase", back_populates="client")
 
+    # Indexes for the most frequent and most selective search filters; keep in
+    # sync with the migrations/versions scripts that add them to existing databases
+    __table_args__ = (
+        Index("ix_clients_age", "age"),
+        Index("ix_clients_level_of_schooling_age", "level_of_schooling", "age"),
+        Index("ix_clients_employed_level_of_schooling", "currently_employed", "level_of_schooling"),
+        Index("ix_clients_housing_income_source", "housing", "income_source"),
+        Index("ix_clients_time_unemployed", "time_unemployed"),
+    )
+
 
 class ClientCase(Base):
     """ClientCase model representing case assignments between users and clients."""
@@ -105,3 +119,24 @@ class ClientCase(Base):
 
     client = relationship("Client", back_populates="cases")
     user = relationship("User", back_populates="cases")
+
+    # The primary key only covers lookups by client; these serve case worker
+    # and success rate searches
+    __table_args__ = (
+        Index("ix_client_cases_user_id", "user_id"),
+        Index("ix_client_cases_success_rate", "success_rate"),
+    )
+
+
+class ClientPrediction(Base):
+    """
+    ClientPrediction model materializing the prediction for a stored client
+    under one model, so it can be read without rescoring.
+    """
+    __tablename__ = "client_predictions"
+
+    client_id = Column(Integer, ForeignKey("clients.id"), primary_key=True)
+    model_name = Column(String(50), primary_key=True)
+    baseline = Column(Float, nullable=False)
+    interventions = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
@@ -0,0 +1,149 @@
+"""
+Traffic replay module.
+Replays requests captured by app.traffic against a running instance of the
+API at a fixed concurrency and request rate, and reports latency
+distributions and error rates per route.
+
+Usage:
+    uvicorn app.main:app --port 8000 &
+    python -m app.replay traffic.jsonl --url http://127.0.0.1:8000 --concurrency 16 --rate 200
+"""
+
+# Standard library imports
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+
+# Third-party imports
+import httpx
+
+# Local imports
+from app.clients.service.benchmark import summarize
+
+
+def load_requests(path, limit=None):
+    """
+    Read captured requests from a JSONL file.
+
+    Args:
+        path (str): Capture file written by TrafficRecorder
+        limit (int): Maximum number of requests to read
+
+    Returns:
+        list: Captured request entries, in capture order
+    """
+    entries = []
+    with open(path, encoding="utf-8") as capture_file:
+        for line in capture_file:
+            if line.strip():
+                entries.append(json.loads(line))
+            if limit is not None and len(entries) >= limit:
+                break
+    return entries
+
+
+def _body_arguments(entry):
+    """Return the httpx keyword that sends an entry's body in its captured format."""
+    if entry.get("body") is None:
+        return {}
+    if entry.get("body_format") == "form":
+        return {"data": entry["body"]}
+    return {"json": entry["body"]}
+
+
+async def replay(client, entries, concurrency=8, rate=None, headers=None):
+    """
+    Send captured requests with at most concurrency in flight.
+
+    Args:
+        client (httpx.AsyncClient): Client bound to the target instance
+        entries (list): Captured request entries
+        concurrency (int): Maximum number of requests in flight
+        rate (float): Target requests per second, None to send as fast as possible
+        headers (dict): Extra headers sent with every request, e.g. Authorization
+
+    Returns:
+        list: (route, status, seconds) per request; status is None on a transport error
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+
+    async def send(index, entry):
+        if rate:
+            await asyncio.sleep(max(0.0, start + index / rate - time.perf_counter()))
+        url = entry["path"] + (f"?{entry['query']}" if entry.get("query") else "")
+        async with semaphore:
+            sent = time.perf_counter()
+            try:
+                response = await client.request(
+                    entry["method"], url, headers=headers, **_body_arguments(entry)
+                )
+                status_code = response.status_code
+            except httpx.HTTPError:
+                status_code = None
+            route = f"{entry['method']} {entry.get('route', entry['path'])}"
+            return route, status_code, time.perf_counter() - sent
+
+    return await asyncio.gather(*(send(index, entry) for index, entry in enumerate(entries)))
+
+
+def report(outcomes, elapsed=None):
+    """
+    Summarize replay outcomes per route.
+
+    Args:
+        outcomes (list): (route, status, seconds) per request
+        elapsed (float): Wall-clock duration of the replay, for overall throughput
+
+    Returns:
+        dict: Per route latency percentiles, request count and error rate
+    """
+    by_route = defaultdict(list)
+    for route, status_code, seconds in outcomes:
+        by_route[route].append((status_code, seconds))
+    summary = {}
+    for route, results in sorted(by_route.items()):
+        errors = sum(1 for status_code, _ in results if status_code is None or status_code >= 400)
+        summary[route] = dict(
+            summarize([seconds for _, seconds in results]),
+            requests=len(results),
+            error_rate=errors / len(results)
+        )
+        if elapsed:
+            summary[route]["throughput_per_s"] = len(results) / elapsed
+    return summary
+
+
+async def _main(args):
+    """Replay a capture file against args.url and print the per-route report."""
+    entries = load_requests(args.capture_file, args.limit)
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else None
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        outcomes = await replay(client, entries, args.concurrency, args.rate, headers)
+        elapsed = time.perf_counter() - start
+    summary = report(outcomes, elapsed)
+    print(f"{len(outcomes)} requests in {elapsed:.2f} s ({len(outcomes) / elapsed:.1f}/s)")
+    for route, stats in summary.items():
+        print(f"{route:50s} n {stats['requests']:6d}  p50 {stats['p50_ms']:8.2f} ms  "
+              f"p95 {stats['p95_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms  "
+              f"errors {stats['error_rate']:.1%}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(summary, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured API traffic")
+    parser.add_argument("capture_file", help="JSONL file written by traffic capture")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the instance")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, help="Requests per second, default unthrottled")
+    parser.add_argument("--limit", type=int, help="Replay at most this many requests")
+    parser.add_argument("--token", help="Bearer token sent with every request")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="Write the per-route report as JSON to this file")
+    asyncio.run(_main(parser.parse_args()))
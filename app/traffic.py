@@ -0,0 +1,233 @@
+"""
+Traffic capture module.
+Samples live API requests into a JSONL file so production load shapes can be
+replayed later with app.replay.
+"""
+
+# Standard library imports
+import hashlib
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from urllib.parse import parse_qsl
+
+# Local imports
+from app.config import settings
+
+logger = logging.getLogger("uvicorn")
+
+# Body fields recorded as sent; every other value is replaced with a stable
+# hash. Add fields with TRAFFIC_CAPTURE_SAFE_FIELDS
+SAFE_FIELDS = frozenset({"name", "include_interventions", "role"})
+# Body fields that are hashed even when listed as safe
+SENSITIVE_FIELDS = frozenset({"username", "password", "email", "token", "access_token"})
+# Bodies larger than this are not recorded
+MAX_BODY_BYTES = 65536
+# Content types whose bodies are recorded, by the form they are replayed in
+BODY_FORMATS = {"application/json": "json", "application/x-www-form-urlencoded": "form"}
+
+
+def anonymize(value, safe_fields=SAFE_FIELDS, field=None):
+    """
+    Replace every value in a JSON body outside safe_fields with a stable hash.
+
+    The structure of objects and lists is kept, so a client's demographics in
+    a create, update or prediction body are hashed one by one. The same input
+    always maps to the same placeholder, so replayed traffic keeps its key
+    distribution without exposing the original values.
+
+    Args:
+        value: Decoded JSON body, or part of it
+        safe_fields (set): Field names whose values are kept
+        field (str): Name of the field value belongs to, None at the top level
+    """
+    if isinstance(value, dict):
+        return {key: anonymize(item, safe_fields, key) for key, item in value.items()}
+    if isinstance(value, list):
+        return [anonymize(item, safe_fields, field) for item in value]
+    if value is None or (field in safe_fields and field not in SENSITIVE_FIELDS):
+        return value
+    return _mask(value)
+
+
+def _mask(value):
+    """Return a stable placeholder for a sensitive value."""
+    digest = hashlib.sha256(str(value).encode("utf-8")).hexdigest()
+    return f"anon-{digest[:12]}"
+
+
+def route_template(scope):
+    """
+    Return the matched route's path template, e.g. /clients/{client_id}.
+
+    The router stores the matched route in the scope; before routing, or when
+    nothing matched, the raw request path is returned.
+    """
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or scope["path"]
+
+
+class TrafficRecorder:
+    """
+    Buffered, non-blocking JSONL writer for captured requests.
+
+    record never blocks: entries go onto a bounded queue drained by a single
+    daemon thread that appends them to the file, and are dropped (and counted)
+    when the queue is full.
+    """
+
+    def __init__(self, path, sample_rate=1.0, queue_size=1024):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.recorded = 0
+        self.dropped = 0
+
+    def should_sample(self):
+        """Decide whether to capture the next request."""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def _ensure_worker(self):
+        """Start the background thread on first use."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._work, name="traffic-recorder", daemon=True
+                )
+                self._thread.start()
+
+    def record(self, entry):
+        """Queue one captured request for writing, dropping it if the queue is full."""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        self._ensure_worker()
+
+    def join(self):
+        """Block until every queued entry has been written."""
+        self._queue.join()
+
+    def _work(self):
+        """Drain the queue forever, writing whatever is queued in one append."""
+        while True:
+            entries = [self._queue.get()]
+            while True:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, "a", encoding="utf-8") as capture_file:
+                    capture_file.writelines(json.dumps(entry) + "\n" for entry in entries)
+                with self._lock:
+                    self.recorded += len(entries)
+            except OSError:
+                logger.exception("Writing captured traffic failed")
+                with self._lock:
+                    self.dropped += len(entries)
+            finally:
+                for _ in entries:
+                    self._queue.task_done()
+
+    def stats(self):
+        """Return the number of written and dropped entries and the queue depth."""
+        with self._lock:
+            return {
+                "recorded": self.recorded,
+                "dropped": self.dropped,
+                "queued": self._queue.qsize()
+            }
+
+
+class TrafficCaptureMiddleware:
+    """
+    ASGI middleware that records a sample of HTTP requests.
+
+    Each captured entry holds the method, path, route template, query string,
+    anonymized JSON or form body with its format (None for other content
+    types), response status and server-side duration. Authorization headers
+    are never recorded.
+    """
+
+    def __init__(self, app, recorder, safe_fields=SAFE_FIELDS):
+        self.app = app
+        self.recorder = recorder
+        self.safe_fields = frozenset(safe_fields)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.recorder.should_sample():
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        response = {"status": None, "end": None}
+
+        async def receive_and_capture():
+            message = await receive()
+            if message["type"] == "http.request" and len(body) <= MAX_BODY_BYTES:
+                body.extend(message.get("body", b""))
+            return message
+
+        async def send_and_capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            await send(message)
+            # Background tasks run after the last body message; they are not
+            # part of the request's duration
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response["end"] = response["end"] or time.perf_counter()
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_and_capture, send_and_capture)
+        finally:
+            duration = (response["end"] or time.perf_counter()) - start
+            body_format, recorded_body = self._body(scope, bytes(body))
+            self.recorder.record({
+                "timestamp": time.time(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route_template(scope),
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "body_format": body_format,
+                "body": recorded_body,
+                "status": response["status"],
+                "duration_ms": duration * 1000
+            })
+
+    def _body(self, scope, body):
+        """
+        Decode and anonymize a JSON or form-encoded request body.
+
+        Returns:
+            tuple: ("json" or "form", anonymized body), or (None, None) if the
+                body is empty, too large or of another content type
+        """
+        headers = dict(scope.get("headers", []))
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        body_format = BODY_FORMATS.get(content_type.split(";")[0].strip().lower())
+        if not body or len(body) > MAX_BODY_BYTES or body_format is None:
+            return None, None
+        try:
+            if body_format == "form":
+                decoded = dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True))
+            else:
+                decoded = json.loads(body)
+        except ValueError:
+            return None, None
+        return body_format, anonymize(decoded, self.safe_fields)
+
+
+TRAFFIC_RECORDER = TrafficRecorder(
+    settings.traffic_capture_path,
+    sample_rate=settings.traffic_capture_sample_rate,
+    queue_size=settings.traffic_capture_queue_size
+)
@@ -0,0 +1,39 @@
+"""Add indexes for client searches
+
+Databases created before the indexes were declared on the models get them
+here; databases created by create_all already have them, hence if_not_exists.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns), matching __table_args__ in app/models.py
+INDEXES = [
+    ("ix_clients_age", "clients", ["age"]),
+    ("ix_clients_level_of_schooling_age", "clients", ["level_of_schooling", "age"]),
+    ("ix_clients_employed_level_of_schooling", "clients",
+     ["currently_employed", "level_of_schooling"]),
+    ("ix_clients_housing_income_source", "clients", ["housing", "income_source"]),
+    ("ix_clients_time_unemployed", "clients", ["time_unemployed"]),
+    ("ix_client_cases_user_id", "client_cases", ["user_id"]),
+    ("ix_client_cases_success_rate", "client_cases", ["success_rate"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+    # Refresh planner statistics so the new indexes are costed correctly
+    op.execute("ANALYZE")
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
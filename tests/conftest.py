@@ -1,8 +1,11 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.database import Base, get_db
+from sqlalchemy.pool import NullPool
+from app import database
+from app.database import Base, get_async_db, get_db
 from app.main import app
 from app.auth.router import get_password_hash
 from app.models import User, UserRole, Client, ClientCase
@@ -11,6 +14,9 @@ from app.models import User, UserRole, Client, ClientCase
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# TestClient may run each request on a new event loop, so async connections are not pooled
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 @pytest.fixture
 def test_db():
@@ -133,14 +139,69 @@ def test_db():
         Base.metadata.drop_all(bind=engine)
 
 @pytest.fixture
-def client(test_db):
+def multi_case_clients(test_db):
+    """Give every test client a second case, and add a third client with two cases"""
+    client3 = Client(
+        age=41,
+        gender=1,
+        work_experience=10,
+        canada_workex=8,
+        dep_num=3,
+        canada_born=True,
+        citizen_status=True,
+        level_of_schooling=12,
+        fluent_english=True,
+        reading_english_scale=6,
+        speaking_english_scale=6,
+        writing_english_scale=5,
+        numeracy_scale=6,
+        computer_scale=4,
+        transportation_bool=False,
+        caregiver_bool=True,
+        housing=3,
+        income_source=5,
+        felony_bool=False,
+        attending_school=False,
+        currently_employed=False,
+        substance_use=False,
+        time_unemployed=12,
+        need_mental_health_support_bool=True
+    )
+    test_db.add(client3)
+    test_db.commit()
+
+    for client_id, user_id, success_rate in [(1, 2, 90), (2, 1, 80), (3, 1, 70), (3, 2, 95)]:
+        test_db.add(ClientCase(
+            client_id=client_id,
+            user_id=user_id,
+            employment_assistance=True,
+            life_stabilization=False,
+            retention_services=True,
+            specialized_services=False,
+            employment_related_financial_supports=False,
+            employer_financial_supports=False,
+            enhanced_referrals=False,
+            success_rate=success_rate
+        ))
+    test_db.commit()
+    return [1, 2, 3]
+
+@pytest.fixture
+def client(test_db, monkeypatch):
     def override_get_db():
         try:
             yield test_db
         finally:
             test_db.close()
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # Background tasks open their own sessions rather than using the dependency
+    monkeypatch.setattr(database, "AsyncSessionLocal", TestingAsyncSessionLocal)
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -1,5 +1,30 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
 import pytest
-from fastapi import status
+from fastapi import BackgroundTasks, FastAPI, status
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy.engine import make_url
+
+from app.clients.service import logic
+from app.clients.service.executor import PREDICTION_EXECUTOR
+from app.clients.service.metrics import STAGE_TIMER
+from app.clients.service.pagination import CLIENT_COUNT, database_key
+from app.clients.service.tree_engine import model_type_name
+from app.http_metrics import HTTPMetricsMiddleware
+from app.main import app
+from app.replay import load_requests, replay, report
+from app.traffic import (
+    SAFE_FIELDS,
+    TrafficCaptureMiddleware,
+    TrafficRecorder,
+    anonymize,
+    route_template
+)
 
 # Test GET Operations
 def test_get_clients_unauthorized(client):
@@ -16,6 +41,32 @@ def test_get_clients_as_admin(client, admin_headers):
     assert "total" in data
     assert len(data["clients"]) > 0
 
+def test_get_clients_cursor_pagination(client, admin_headers):
+    """Test walking clients with next_cursor and keeping the cached total in step with deletes"""
+    response = client.get("/clients/", params={"limit": 1}, headers=admin_headers)
+    data = response.json()
+    total = data["total"]
+    ids = [c["id"] for c in data["clients"]]
+    while data["next_cursor"] is not None:
+        response = client.get(
+            "/clients/", params={"limit": 1, "after_id": data["next_cursor"]}, headers=admin_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        ids.extend(c["id"] for c in data["clients"])
+    assert ids == sorted(ids)
+    assert len(ids) == total
+
+    key = database_key(make_url("sqlite:///./test.db"))
+    assert CLIENT_COUNT.get(key) == total
+    client.delete(f"/clients/{ids[0]}", headers=admin_headers)
+    assert CLIENT_COUNT.get(key) == total - 1
+    response = client.get("/clients/", headers=admin_headers)
+    assert response.json()["total"] == total - 1
+
+    response = client.get("/clients/", params={"after_id": "not-a-cursor"}, headers=admin_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
 def test_get_client_by_id(client, admin_headers):
     """Test getting specific client"""
     # Test existing client
@@ -58,6 +109,80 @@ def test_get_clients_by_criteria(client, admin_headers):
     )
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY  # Changed from 400
 
+def test_search_pagination_and_streaming(client, admin_headers):
+    """Test search endpoints page with X-Next-Cursor and stream the same clients as NDJSON"""
+    for path, params in [
+        ("/clients/search/by-criteria", {"age_min": 18}),
+        ("/clients/search/by-services", {"employment_assistance": True}),
+        ("/clients/search/success-rate", {"min_rate": 0}),
+        ("/clients/case-worker/2", {}),
+    ]:
+        expected = client.get(path, params=params, headers=admin_headers).json()
+        assert expected
+
+        pages, cursor = [], None
+        while True:
+            page_params = dict(params, limit=1, **({"after_id": cursor} if cursor else {}))
+            response = client.get(path, params=page_params, headers=admin_headers)
+            assert response.status_code == status.HTTP_200_OK
+            pages.extend(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        assert [c["id"] for c in pages] == [c["id"] for c in expected]
+
+        response = client.get(path, params=dict(params, stream=True), headers=admin_headers)
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert [json.loads(line) for line in response.text.splitlines()] == expected
+
+        response = client.get(path, params=dict(params, stream=True, limit=1), headers=admin_headers)
+        assert [json.loads(line) for line in response.text.splitlines()] == expected[:1]
+
+    response = client.get("/clients/case-worker/999", params={"stream": True}, headers=admin_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_search_pages_clients_with_several_cases_once(client, admin_headers, multi_case_clients):
+    """Test pages and streams of case-based searches list each client once, in id order"""
+    for path, params in [
+        ("/clients/search/by-services", {"employment_assistance": True}),
+        ("/clients/search/success-rate", {"min_rate": 70}),
+        ("/clients/case-worker/2", {}),
+    ]:
+        ids, cursor = [], None
+        while True:
+            page_params = dict(params, limit=2, **({"after_id": cursor} if cursor else {}))
+            response = client.get(path, params=page_params, headers=admin_headers)
+            page = [c["id"] for c in response.json()]
+            assert 0 < len(page) <= 2
+            ids.extend(page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        assert ids == multi_case_clients
+
+        response = client.get(path, params=dict(params, stream=True), headers=admin_headers)
+        assert [json.loads(line)["id"] for line in response.text.splitlines()] == multi_case_clients
+
+
+def test_explain_clients_by_criteria(client, admin_headers, case_worker_headers):
+    """Test the search explain endpoint shows the most selective filter first and an index in use"""
+    params = {"employment_status": True, "education_level": 3, "age_min": 30}
+    response = client.get(
+        "/clients/search/by-criteria/explain", params=params, headers=admin_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    where = data["sql"].split("WHERE")[1]
+    assert where.index("level_of_schooling") < where.index("currently_employed")
+    assert any("USING INDEX" in step for step in data["plan"])
+
+    response = client.get(
+        "/clients/search/by-criteria/explain", params=params, headers=case_worker_headers
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
 def test_get_clients_by_services(client, admin_headers):
     """Test getting clients by service status"""
     response = client.get(
@@ -152,3 +277,352 @@ def test_delete_client(client, admin_headers):
     # Test deleting non-existent client
     response = client.delete("/clients/999", headers=admin_headers)
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+# Test Prediction Operations
+PREDICTION_INPUT = {
+    "age": 23,
+    "gender": "1",
+    "work_experience": 1,
+    "canada_workex": 1,
+    "dep_num": 0,
+    "canada_born": "1",
+    "citizen_status": "2",
+    "level_of_schooling": "2",
+    "fluent_english": "3",
+    "reading_english_scale": 2,
+    "speaking_english_scale": 2,
+    "writing_english_scale": 3,
+    "numeracy_scale": 2,
+    "computer_scale": 3,
+    "transportation_bool": "2",
+    "caregiver_bool": "1",
+    "housing": "1",
+    "income_source": "5",
+    "felony_bool": "1",
+    "attending_school": "0",
+    "currently_employed": "1",
+    "substance_use": "1",
+    "time_unemployed": 1,
+    "need_mental_health_support_bool": "1"
+}
+
+def test_predict(client):
+    """Test single client prediction"""
+    response = client.post("/clients/predictions", json=PREDICTION_INPUT)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert "baseline" in data
+    assert len(data["interventions"]) == 3
+
+def test_predict_batch(client):
+    """Test batch prediction matches single client predictions"""
+    other_input = {**PREDICTION_INPUT, "age": 45, "housing": "Homeowner", "time_unemployed": 4}
+    inputs = [PREDICTION_INPUT, other_input, PREDICTION_INPUT]
+    response = client.post("/clients/predictions/batch", json=inputs)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert len(data) == len(inputs)
+    for item, result in zip(inputs, data):
+        single = client.post("/clients/predictions", json=item).json()
+        assert result == single
+
+def test_predict_batch_chunking():
+    """Test that chunking a batch does not change its results"""
+    from app.clients.service.logic import interpret_and_calculate_batch
+    inputs = [{**PREDICTION_INPUT, "age": age} for age in range(20, 25)]
+    assert interpret_and_calculate_batch(inputs, chunk_size=2) == \
+        interpret_and_calculate_batch(inputs)
+
+def test_prediction_cache(client):
+    """Test repeated predictions are served from the cache until the model changes"""
+    from app.clients.service.logic import PREDICTION_CACHE
+    PREDICTION_CACHE.clear()
+    first = client.post("/clients/predictions", json=PREDICTION_INPUT).json()
+    hits_before = client.get("/clients/predictions/cache").json()["hits"]
+    assert client.post("/clients/predictions", json=PREDICTION_INPUT).json() == first
+    stats = client.get("/clients/predictions/cache").json()
+    assert stats["hits"] == hits_before + 1
+    assert stats["size"] == 1
+
+    try:
+        response = client.put("/clients/models/current/linear_regression")
+        assert response.status_code == status.HTTP_200_OK
+        assert client.get("/clients/predictions/cache").json()["size"] == 0
+        assert client.post("/clients/predictions", json=PREDICTION_INPUT).json() != first
+    finally:
+        client.put("/clients/models/current/random_forest")
+
+def test_predict_with_micro_batching(client, monkeypatch):
+    """Test micro-batched predictions match direct predictions"""
+    from app.config import settings
+    expected = client.post("/clients/predictions", json=PREDICTION_INPUT).json()
+    monkeypatch.setattr(settings, "prediction_microbatch_enabled", True)
+    response = client.post("/clients/predictions", json=PREDICTION_INPUT)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == expected
+    assert client.get("/clients/predictions/batcher").json()["batch_size"]["count"] >= 1
+
+def test_predict_with_model_parameter(client):
+    """Test per-request model selection leaves the active model unchanged"""
+    default = client.post("/clients/predictions", json=PREDICTION_INPUT).json()
+    response = client.post(
+        "/clients/predictions", params={"model": "linear_regression"}, json=PREDICTION_INPUT
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() != default
+    batch = client.post(
+        "/clients/predictions/batch", params={"model": "linear_regression"}, json=[PREDICTION_INPUT]
+    ).json()
+    assert batch == [response.json()]
+    assert client.get("/clients/models/current").json()["type"] == "RandomForestRegressor"
+
+    response = client.post(
+        "/clients/predictions", params={"model": "unknown"}, json=PREDICTION_INPUT
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_set_current_model(client):
+    """Test switching the active model through the registry"""
+    try:
+        response = client.put("/clients/models/current/gradient_boost")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"name": "gradient_boost", "type": "GradientBoostingRegressor"}
+        assert client.get("/clients/models/current").json()["name"] == "gradient_boost"
+    finally:
+        client.put("/clients/models/current/random_forest")
+    response = client.put("/clients/models/current/unknown")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_set_current_model_same_type_refreshes_on_rename(client, monkeypatch):
+    """Test naming the loaded model goes through the registry and refreshes stored predictions"""
+    from app.clients.service.prediction_service import AsyncPredictionService
+    from app.clients.service.registry import MODEL_REGISTRY
+    refreshed = []
+
+    async def record_refresh(client_ids=None, model_name=None):
+        refreshed.append((client_ids, model_name))
+
+    monkeypatch.setattr(AsyncPredictionService, "refresh_in_background", record_refresh)
+    monkeypatch.setattr(MODEL_REGISTRY, "active_name", MODEL_REGISTRY.active_name)
+    monkeypatch.setitem(MODEL_REGISTRY.models, "forest_copy", "RandomForestRegressor")
+    client.put("/clients/models/current/random_forest")
+    refreshed.clear()
+
+    response = client.put("/clients/models/current/forest_copy")
+    assert response.json() == {"name": "forest_copy", "type": "RandomForestRegressor"}
+    assert MODEL_REGISTRY.current_name() == "forest_copy"
+    assert refreshed == [(None, "forest_copy")]
+
+    # Naming the model it already has changes nothing and refreshes nothing
+    client.put("/clients/models/current/forest_copy")
+    assert refreshed == [(None, "forest_copy")]
+
+def test_current_model_resolved_off_event_loop(client, monkeypatch):
+    """Test the model endpoints load the active model in a worker thread, not on the event loop"""
+    get_model = logic.get_model
+    loaded_on_loop = []
+
+    def recording_get_model():
+        try:
+            asyncio.get_running_loop()
+            loaded_on_loop.append(True)
+        except RuntimeError:
+            loaded_on_loop.append(False)
+        return get_model()
+
+    monkeypatch.setattr(logic, "get_model", recording_get_model)
+    assert client.get("/clients/models/current").status_code == status.HTTP_200_OK
+    assert client.put("/clients/models/current/random_forest").status_code == status.HTTP_200_OK
+    assert loaded_on_loop and not any(loaded_on_loop)
+
+def test_shadow_model(client):
+    """Test shadow scoring aggregates agreement without changing responses"""
+    from app.clients.service.registry import SHADOW_SCORER
+    response = client.put("/clients/models/shadow/gradient_boost")
+    assert response.status_code == status.HTTP_200_OK
+    try:
+        expected = client.post("/clients/predictions", params={"model": "random_forest"},
+                               json=PREDICTION_INPUT).json()
+        assert client.post("/clients/predictions", json=PREDICTION_INPUT).json() == expected
+        client.post("/clients/predictions/batch", json=[PREDICTION_INPUT, PREDICTION_INPUT])
+        SHADOW_SCORER.join()
+        stats = client.get("/clients/models/shadow").json()
+        assert stats["model"] == "gradient_boost"
+        assert stats["compared"] == 4
+        assert stats["errors"] == 0
+        assert 0 <= stats["mean_top3_overlap"] <= 1
+    finally:
+        client.delete("/clients/models/shadow")
+    assert client.get("/clients/models/shadow").json()["model"] is None
+
+def test_get_client_predictions(client, admin_headers, test_db):
+    """Test stored client predictions are served and refreshed after updates"""
+    from app.models import ClientPrediction
+    response = client.get("/clients/1/predictions", headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["client_id"] == 1
+    assert data["model_name"] == "random_forest"
+    assert len(data["interventions"]) == 3
+
+    response = client.put("/clients/1", json={"age": 60}, headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    test_db.expire_all()
+    assert test_db.get(ClientPrediction, (1, "random_forest")) is not None
+    assert test_db.get(ClientPrediction, (2, "random_forest")) is None
+
+    response = client.get("/clients/999/predictions", headers=admin_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_client_predictions_share_prediction_queue(client, admin_headers, monkeypatch):
+    """Test on-demand stored predictions are rejected with 503 when the prediction queue is full"""
+    full = PREDICTION_EXECUTOR.max_workers + PREDICTION_EXECUTOR.max_queue
+    monkeypatch.setattr(PREDICTION_EXECUTOR, "pending", full)
+    response = client.get("/clients/1/predictions", headers=admin_headers)
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+def test_predict_what_if(client):
+    """Test the what-if grid covers every combination of feature values"""
+    request = {
+        "client": PREDICTION_INPUT,
+        "features": [
+            {"name": "numeracy_scale", "values": [2, 5, 8]},
+            {"name": "time_unemployed", "values": [0, 1]}
+        ]
+    }
+    response = client.post("/clients/predictions/what-if", json=request)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["features"] == ["numeracy_scale", "time_unemployed"]
+    assert len(data["surface"]) == 3
+    assert all(len(row) == 2 for row in data["surface"])
+    single = client.post("/clients/predictions", json=PREDICTION_INPUT).json()
+    assert data["baseline"] == single["baseline"]
+    # numeracy_scale=2, time_unemployed=1 is the unmodified client
+    assert data["surface"][0][1] == single["baseline"]
+
+    request["include_interventions"] = True
+    data = client.post("/clients/predictions/what-if", json=request).json()
+    assert data["interventions"][0][1] == single
+
+    request["features"] = [{"name": "unknown", "values": [1]}]
+    response = client.post("/clients/predictions/what-if", json=request)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    request["features"] = [{"name": "age", "values": list(range(100))},
+                           {"name": "dep_num", "values": list(range(100))}]
+    response = client.post("/clients/predictions/what-if", json=request)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_predict_with_explanations(client):
+    """Test attributions are only added on request and match between endpoints"""
+    plain = client.post("/clients/predictions", json=PREDICTION_INPUT).json()
+    assert "attributions" not in plain
+
+    response = client.post("/clients/predictions?explain=true", json=PREDICTION_INPUT)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["baseline"] == plain["baseline"]
+    assert data["interventions"] == plain["interventions"]
+    assert len(data["attributions"]) == 7
+    assert all(set(item) == {"name", "shapley", "uplift"} for item in data["attributions"])
+
+    batch = client.post("/clients/predictions/batch?explain=true",
+                        json=[PREDICTION_INPUT]).json()
+    assert batch[0]["attributions"] == data["attributions"]
+
+def test_traffic_capture_and_replay(client, admin_headers, tmp_path):
+    """Test captured requests are anonymized and can be replayed per route"""
+    capture_path = tmp_path / "traffic.jsonl"
+    recorder = TrafficRecorder(str(capture_path))
+    # Prediction inputs are recorded as sent so their replay passes validation
+    capturing = TestClient(TrafficCaptureMiddleware(
+        app, recorder, safe_fields=SAFE_FIELDS | set(PREDICTION_INPUT)
+    ))
+    capturing.post("/clients/predictions", json=PREDICTION_INPUT)
+    capturing.get("/clients/1", headers=admin_headers)
+    capturing.post("/auth/token", data={"username": "testadmin", "password": "testpass123"})
+    recorder.join()
+
+    entries = load_requests(str(capture_path))
+    assert [entry["route"] for entry in entries] == [
+        "/clients/predictions", "/clients/{client_id}", "/auth/token"
+    ]
+    assert entries[0]["body"] == PREDICTION_INPUT
+    assert entries[1]["status"] == status.HTTP_200_OK
+    assert entries[2]["body_format"] == "form"
+    assert entries[2]["body"]["password"].startswith("anon-")
+    assert "testpass123" not in capture_path.read_text()
+    assert anonymize({"password": "secret"})["password"].startswith("anon-")
+    # Client fields are hashed unless listed as safe
+    anonymized = anonymize({"age": 30, "include_interventions": True})
+    assert anonymized["age"].startswith("anon-")
+    assert anonymized["include_interventions"] is True
+
+    async def replay_in_process():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+            return await replay(async_client, entries[:3] * 3, concurrency=2, rate=1000,
+                                headers=admin_headers)
+
+    outcomes = asyncio.run(replay_in_process())
+    summary = report(outcomes)
+    assert summary["POST /clients/predictions"]["requests"] == 3
+    assert summary["POST /clients/predictions"]["error_rate"] == 0
+    assert summary["GET /clients/{client_id}"]["error_rate"] == 0
+    # The hashed credentials are sent as a form and rejected, not failed as malformed JSON
+    assert {status_code for route, status_code, _ in outcomes if route == "POST /auth/token"} == {
+        status.HTTP_401_UNAUTHORIZED
+    }
+
+
+def test_route_template_uses_matched_route():
+    """Test route templates come from the matched route, not from path parameter values"""
+    route = SimpleNamespace(path_format="/clients/{client_id}/services/{service_id}")
+    assert route_template({"path": "/clients/1/services/1", "route": route}) == route.path_format
+    assert route_template({"path": "/unknown/1"}) == "/unknown/1"
+
+def test_prediction_stage_metrics(client, monkeypatch):
+    """Test enabled stage timers show up on /metrics labeled by stage and model"""
+    monkeypatch.setattr(STAGE_TIMER, "enabled", True)
+    logic.PREDICTION_CACHE.clear()
+    client.post("/clients/predictions", json=PREDICTION_INPUT)
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    model_name = model_type_name(logic.get_model())
+    for stage in ("encode", "cache", "predict", "select", "format"):
+        assert f'prediction_stage_seconds_count{{model="{model_name}",stage="{stage}"}}' \
+            in response.text
+
+def test_http_metrics(client, admin_headers):
+    """Test requests are counted per route template with database time recorded"""
+    def sample(name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    labels = {"method": "GET", "route": "/clients/{client_id}"}
+    requests_before = sample("http_requests_total", dict(labels, status="200"))
+    db_before = sample("http_request_db_seconds_count", labels)
+    response = client.get("/clients/1", headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert sample("http_requests_total", dict(labels, status="200")) == requests_before + 1
+    assert sample("http_request_db_seconds_count", labels) == db_before + 1
+    assert sample("http_request_db_seconds_sum", labels) > 0
+    assert sample("http_requests_in_progress", {"method": "GET"}) == 0
+    assert "http_request_duration_seconds_bucket" in client.get("/metrics").text
+
+
+def test_http_metrics_exclude_background_tasks():
+    """Test request latency stops at the last response body, before background tasks run"""
+    background_app = FastAPI()
+
+    @background_app.get("/slow-background")
+    async def slow_background(background_tasks: BackgroundTasks):
+        background_tasks.add_task(time.sleep, 0.3)
+        return {"ok": True}
+
+    background_app.add_middleware(HTTPMetricsMiddleware)
+    labels = {"method": "GET", "route": "/slow-background"}
+    with TestClient(background_app) as test_client:
+        assert test_client.get("/slow-background").status_code == status.HTTP_200_OK
+    assert REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) == 1
+    assert REGISTRY.get_sample_value("http_request_duration_seconds_sum", labels) < 0.2
+    assert REGISTRY.get_sample_value("http_requests_in_progress", {"method": "GET"}) == 0
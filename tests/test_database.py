@@ -0,0 +1,115 @@
+import asyncio
+import sqlite3
+
+from alembic import command
+from alembic.config import Config
+
+from app.clients.service.client_service import AsyncClientService, ClientService
+from app.config import Settings
+from app.database import Base, async_database_url, create_database_engine, database_report
+from tests.conftest import TestingAsyncSessionLocal
+
+
+def test_tuned_sqlite_engine_reports_pragmas(tmp_path):
+    """Test every SQLite connection gets the configured pragmas and pool settings"""
+    config = Settings(database_pool_size=3, database_max_overflow=2, sqlite_busy_timeout_ms=1234)
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'tuned.db'}", config)
+    report = database_report(engine)
+    assert report["dialect"] == "sqlite"
+    assert report["journal_mode"] == "wal"
+    assert report["synchronous"] == 1
+    assert report["busy_timeout"] == 1234
+    assert report["cache_size"] == -config.sqlite_cache_size_kib
+    assert report["pool_size"] == 3
+    assert report["max_overflow"] == 2
+    engine.dispose()
+
+
+def test_untuned_sqlite_and_postgres_engines(tmp_path):
+    """Test tuning can be turned off and PostgreSQL URLs get a pool without a password in reports"""
+    config = Settings(sqlite_tuned=False)
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'plain.db'}", config)
+    assert database_report(engine)["journal_mode"] == "delete"
+    engine.dispose()
+
+    assert async_database_url("postgresql://app:secret@db/cases").drivername == "postgresql+asyncpg"
+    assert async_database_url("sqlite:///./cases.db").drivername == "sqlite+aiosqlite"
+
+    engine = create_database_engine("postgresql://app:secret@db:5432/cases", Settings())
+    assert engine.driver == "psycopg2"
+    assert engine.pool.size() == Settings().database_pool_size
+    assert "secret" not in engine.url.render_as_string(hide_password=True)
+
+
+def test_async_client_service_matches_sync_service(test_db):
+    """Test the async service returns the same clients as the sync service"""
+    async def query_async():
+        async with TestingAsyncSessionLocal() as db:
+            listing = await AsyncClientService.get_clients(db, skip=0, limit=10)
+            by_criteria = await AsyncClientService.get_clients_by_criteria(db, age_min=26)
+            by_services = await AsyncClientService.get_clients_by_services(
+                db, retention_services=True
+            )
+            by_case_worker = await AsyncClientService.get_clients_by_case_worker(db, 2)
+            return listing, by_criteria, by_services, by_case_worker
+
+    listing, by_criteria, by_services, by_case_worker = asyncio.run(query_async())
+    expected = ClientService.get_clients(test_db, skip=0, limit=10)
+    assert [client.id for client in listing["clients"]] == \
+        [client.id for client in expected["clients"]]
+    assert listing["total"] == expected["total"]
+    assert [client.id for client in by_criteria] == \
+        [client.id for client in ClientService.get_clients_by_criteria(test_db, age_min=26)]
+    assert [client.id for client in by_services] == [
+        client.id for client in ClientService.get_clients_by_services(
+            test_db, retention_services=True
+        )
+    ]
+    assert [client.id for client in by_case_worker] == [2]
+
+
+def test_async_searches_return_each_client_once(test_db, multi_case_clients):
+    """Test clients with several matching cases are returned once, as by the sync service"""
+    async def query_async():
+        async with TestingAsyncSessionLocal() as db:
+            by_services = await AsyncClientService.get_clients_by_services(
+                db, employment_assistance=True
+            )
+            by_success_rate = await AsyncClientService.get_clients_by_success_rate(db, 70)
+            by_case_worker = await AsyncClientService.get_clients_by_case_worker(db, 2)
+            return by_services, by_success_rate, by_case_worker
+
+    by_services, by_success_rate, by_case_worker = asyncio.run(query_async())
+    assert [client.id for client in by_services] == multi_case_clients
+    assert [client.id for client in by_success_rate] == multi_case_clients
+    assert [client.id for client in by_case_worker] == multi_case_clients
+    assert [client.id for client in ClientService.get_clients_by_services(
+        test_db, employment_assistance=True
+    )] == multi_case_clients
+
+
+def test_migration_adds_search_indexes_to_existing_database(tmp_path):
+    """Test the index migration upgrades a database created without indexes and downgrades cleanly"""
+    path = tmp_path / "existing.db"
+    engine = create_database_engine(f"sqlite:///{path}", Settings(sqlite_tuned=False))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(connection)
+    engine.dispose()
+
+    config = Config("alembic.ini")
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    index_names = "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'"
+
+    command.upgrade(config, "head")
+    with sqlite3.connect(path) as connection:
+        created = {name for (name,) in connection.execute(index_names)}
+    assert created == {
+        index.name for table in Base.metadata.sorted_tables for index in table.indexes
+    }
+
+    command.downgrade(config, "base")
+    with sqlite3.connect(path) as connection:
+        assert connection.execute(index_names).fetchall() == []
@@ -0,0 +1,284 @@
+import asyncio
+import os
+import pickle
+import random
+import shutil
+import stat
+import threading
+from itertools import permutations
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.clients.service import logic
+from app.clients.service.batcher import MicroBatcher
+from app.clients.service.benchmark import compare_to_baseline, run_benchmarks
+from app.clients.service.cache import PredictionCache
+from app.clients.service.encoder import ENCODER
+from app.clients.service.executor import PredictionExecutor
+from app.clients.service.model import DATA_PATH, load_dataset, train_all
+from app.clients.service.model_store import export_artifact, load_model
+from app.clients.service.tree_engine import CompiledTreeEnsemble, compare_latency
+
+
+def reference_results(raw_data):
+    """Compute results the original way: two predicts and a full stable sort"""
+    baseline_row = logic.get_baseline_row(raw_data).reshape(1, -1)
+    intervention_rows = logic.create_matrix(raw_data)
+    baseline_prediction = logic.MODEL.predict(baseline_row)
+    intervention_predictions = logic.MODEL.predict(intervention_rows).reshape(-1, 1)
+    result_matrix = np.concatenate((intervention_rows, intervention_predictions), axis=1)
+    result_matrix = result_matrix[result_matrix[:, -1].argsort(kind="stable")]
+    return logic.process_results(baseline_prediction, result_matrix[-3:, -8:])
+
+
+def test_scorer_matches_reference():
+    """Test the scorer kernel reproduces the original pipeline output"""
+    rng = random.Random(0)
+    raw_rows = [[rng.randint(0, 10) for _ in range(24)] for _ in range(20)]
+    results = logic.SCORER.score(logic.MODEL, raw_rows)
+    for raw_data, result in zip(raw_rows, results):
+        assert result == reference_results(raw_data)
+
+
+def test_scorer_top_k_indices_breaks_ties_stably():
+    """Test partial selection matches a full stable argsort with ties"""
+    predictions = np.array([5.0, 7.0, 7.0, 1.0, 7.0, 3.0, 7.0, 2.0])
+    expected = np.argsort(predictions, kind="stable")[-3:]
+    assert np.array_equal(logic.SCORER.top_k_indices(predictions), expected)
+
+
+def test_scorer_attributions_match_permutation_shapley():
+    """Test attributions equal Shapley values averaged over every intervention ordering"""
+    rng = random.Random(2)
+    raw_rows = np.array([[rng.randint(0, 10) for _ in range(24)] for _ in range(2)], dtype=float)
+    predictions = logic.SCORER.predict(logic.MODEL, raw_rows)
+    attributions = logic.SCORER.attributions(predictions)
+    num_interventions = len(logic.COLUMN_INTERVENTIONS)
+    place_values = 2 ** np.arange(num_interventions - 1, -1, -1)
+    for client_predictions, client_attributions in zip(predictions, attributions):
+        expected = np.zeros(num_interventions)
+        orderings = list(permutations(range(num_interventions)))
+        for ordering in orderings:
+            coalition = np.zeros(num_interventions, dtype=int)
+            for intervention in ordering:
+                before = client_predictions[coalition @ place_values]
+                coalition[intervention] = 1
+                expected[intervention] += client_predictions[coalition @ place_values] - before
+        expected /= len(orderings)
+        shapley = [item["shapley"] for item in client_attributions]
+        assert shapley == pytest.approx(expected)
+        assert sum(shapley) == pytest.approx(client_predictions[-1] - client_predictions[0])
+        for index, item in enumerate(client_attributions):
+            alone = client_predictions[place_values[index]] - client_predictions[0]
+            assert item["uplift"] == pytest.approx(alone)
+
+
+def test_prediction_cache_evicts_least_recently_used():
+    """Test size-based LRU eviction and counters"""
+    cache = PredictionCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_prediction_cache_expires_entries():
+    """Test TTL-based expiry"""
+    cache = PredictionCache(maxsize=2, ttl=-1)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+@pytest.mark.parametrize("model_name", ["random_forest", "gradient_boost"])
+def test_compiled_tree_ensemble_matches_sklearn(model_name):
+    """Test the compiled engine reproduces sklearn predictions exactly"""
+    with open(os.path.join(logic.CURRENT_DIR, f"{model_name}.pkl"), "rb") as model_file:
+        model = pickle.load(model_file)
+    rng = np.random.default_rng(0)
+    raw_rows = rng.integers(0, 15, size=(8, 24)).astype(float)
+    matrix = logic.SCORER.build_matrix(raw_rows).copy()
+    assert np.array_equal(CompiledTreeEnsemble(model).predict(matrix), model.predict(matrix))
+    timings = compare_latency(model, matrix, repeats=2)
+    assert timings["sklearn"] > 0 and timings["compiled"] > 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_additive_scorer_matches_matrix_scorer(seed):
+    """Test the closed-form linear path ranks like the full matrix path, including exact ties"""
+    with open(os.path.join(logic.CURRENT_DIR, "linear_regression.pkl"), "rb") as model_file:
+        model = pickle.load(model_file)
+    assert logic.get_scorer(model) is logic.ADDITIVE_SCORER
+    # Equal intervention coefficients make many combinations tie exactly
+    interventions = np.ravel(model.coef_)[24:]
+    assert len(np.unique(interventions)) < len(interventions)
+    rng = random.Random(seed)
+    raw_rows = [[rng.randint(0, 10) for _ in range(24)] for _ in range(400)]
+    expected = logic.SCORER.score(model, raw_rows)
+    actual = logic.ADDITIVE_SCORER.score(model, raw_rows)
+    for expected_result, actual_result in zip(expected, actual):
+        assert actual_result["baseline"] == pytest.approx(expected_result["baseline"])
+        for (expected_value, expected_names), (actual_value, actual_names) in zip(
+                expected_result["interventions"], actual_result["interventions"]):
+            assert actual_value == pytest.approx(expected_value)
+            assert actual_names == expected_names
+
+
+@pytest.mark.parametrize("model_name", ["linear_regression", "random_forest"])
+def test_beam_search_scorer_finds_exhaustive_top_k(model_name):
+    """Test the bounded search finds the exhaustive top-k when the beam is wide enough"""
+    with open(os.path.join(logic.CURRENT_DIR, f"{model_name}.pkl"), "rb") as model_file:
+        model = pickle.load(model_file)
+    beam_scorer = logic.BeamSearchScorer(beam_width=8, budget_seconds=10)
+    rng = random.Random(2)
+    raw_rows = [[rng.randint(0, 10) for _ in range(24)] for _ in range(5)]
+    expected = logic.SCORER.score(model, raw_rows)
+    actual = beam_scorer.score(model, raw_rows)
+    for expected_result, actual_result in zip(expected, actual):
+        assert actual_result["baseline"] == pytest.approx(expected_result["baseline"])
+        assert [names for _, names in actual_result["interventions"]] == \
+            [names for _, names in expected_result["interventions"]]
+
+
+def test_beam_search_scorer_respects_budget():
+    """Test an exhausted budget still returns top-k results after one level"""
+    beam_scorer = logic.BeamSearchScorer(beam_width=2, budget_seconds=0)
+    result = beam_scorer.score(logic.MODEL, [[1] * 24])[0]
+    assert len(result["interventions"]) == 3
+    assert all(len(names) <= 1 for _, names in result["interventions"])
+
+
+def test_prediction_executor_rejects_when_queue_full():
+    """Test the worker pool bounds its queue and times out slow work"""
+    executor = PredictionExecutor(max_workers=1, max_queue=0, timeout=0.05)
+    release = threading.Event()
+
+    async def scenario():
+        slow = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as rejected:
+            await executor.run(sum, [1, 2])
+        assert rejected.value.status_code == 503
+        with pytest.raises(HTTPException) as timed_out:
+            await slow
+        assert timed_out.value.status_code == 504
+        release.set()
+        await asyncio.sleep(0.05)
+        assert await executor.run(sum, [1, 2]) == 3
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+    stats = executor.stats()
+    assert stats["rejected"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_micro_batcher_groups_concurrent_submissions():
+    """Test concurrent submissions are processed in bounded batches"""
+    batches = []
+
+    async def process_batch(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(process_batch, window_seconds=0.01, max_batch_size=3)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(item) for item in range(5)))
+
+    assert asyncio.run(scenario()) == [0, 10, 20, 30, 40]
+    assert batches == [[0, 1, 2], [3, 4]]
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == 2
+    assert stats["batch_size"]["buckets"]["2"] == 1
+
+
+def test_model_artifact_is_memory_mapped(tmp_path):
+    """Test exported artifacts load memory-mapped and predict like the pickle"""
+    pickle_path = tmp_path / "gradient_boost.pkl"
+    shutil.copy(os.path.join(logic.CURRENT_DIR, "gradient_boost.pkl"), pickle_path)
+    export_artifact(str(pickle_path))
+    compiled = load_model(str(pickle_path))
+    assert isinstance(compiled, CompiledTreeEnsemble)
+    assert isinstance(compiled.value.base, np.memmap)
+    sklearn_model = load_model(str(pickle_path), compiled=False)
+    features = np.random.default_rng(0).integers(0, 10, size=(64, 31))
+    assert np.array_equal(compiled.predict(features), sklearn_model.predict(features))
+
+    # A retrained pickle must not be served from the stale artifact
+    with open(pickle_path, "ab") as model_file:
+        model_file.write(b"\0")
+    assert not isinstance(load_model(str(pickle_path)), CompiledTreeEnsemble)
+
+
+def test_encoder_batch_matches_clean_input_data():
+    """Test column-wise batch encoding matches per-record cleaning"""
+    records = [
+        {column: "1" for column in ENCODER.columns},
+        {**{column: 3 for column in ENCODER.columns}, "housing": "Homeowner"},
+        {**{column: "Yes" for column in ENCODER.columns}, "level_of_schooling": "Post graduate",
+         "income_source": "Crown Ward", "age": "abc", "dep_num": "12"},
+    ]
+    expected = np.array([logic.clean_input_data(record) for record in records], dtype=float)
+    assert np.array_equal(ENCODER.encode_batch(records), expected)
+    assert np.array_equal(ENCODER.encode_record(records[2]), expected[2])
+    assert logic.convert_text("Homeowner") == 4
+    assert logic.convert_text("Post graduate") == 14
+    assert logic.convert_text("no") == 0
+    assert logic.convert_text("12") == 12
+    assert logic.convert_text("unknown") == 0
+
+
+def test_benchmark_flags_regressions_against_baseline():
+    """Test benchmark results cover each model and batch size and compare to a baseline"""
+    results = run_benchmarks(["linear_regression"], batch_sizes=(1, 4), repeats=2,
+                             include_route=False)
+    summary = results["models"]["linear_regression"]["4"]
+    assert summary["calls"] == 2
+    assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"]
+    assert compare_to_baseline(results, results) == []
+
+    faster = {"models": {"linear_regression": {"4": dict(summary, p95_ms=summary["p95_ms"] / 2)}}}
+    regressions = compare_to_baseline(results, faster, threshold=0.5)
+    assert [name for name, _, _ in regressions] == ["models/linear_regression/4"]
+
+
+def test_train_all_caches_data_and_writes_versioned_models(tmp_path):
+    """Test parallel training scores every model and replaces the serving pickles"""
+    data_path = tmp_path / "data.csv"
+    shutil.copy(DATA_PATH, data_path)
+    features, targets = load_dataset(str(data_path))
+    assert (tmp_path / "data.npz").exists()
+    assert stat.S_IMODE(os.stat(tmp_path / "data.npz").st_mode) == 0o644
+    cached_features, cached_targets = load_dataset(str(data_path))
+    assert np.array_equal(features, cached_features)
+    assert np.array_equal(targets, cached_targets)
+    assert features.shape[1] == 31
+
+    summary = train_all(["linear_regression", "random_forest"], str(data_path), str(tmp_path))
+    assert [result["model"] for result in summary] == ["linear_regression", "random_forest"]
+    for result in summary:
+        assert os.path.exists(result["version_path"])
+        with open(result["path"], "rb") as model_file:
+            model = pickle.load(model_file)
+        assert model.predict(features[:1]).shape == (1,)
+    assert (tmp_path / "random_forest.joblib").exists()
+    assert not (tmp_path / "linear_regression.joblib").exists()
+    # The default model is re-exported as model.pkl with its artifact
+    assert summary[1]["default_path"] == str(tmp_path / "model.pkl")
+    assert "default_path" not in summary[0]
+    with open(tmp_path / "model.pkl", "rb") as model_file:
+        assert pickle.load(model_file).predict(features[:1]).shape == (1,)
+    assert (tmp_path / "model.joblib").exists()